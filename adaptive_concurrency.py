@@ -0,0 +1,122 @@
+"""
+Adaptive concurrency limits for fan-out to remote APIs.
+
+An AdaptiveLimiter works like a semaphore whose size follows the upstream
+(AIMD, additive increase, multiplicative decrease). Every finished request
+reports its latency and whether the upstream pushed back (429, 5xx, timeout,
+connection error):
+
+- a healthy answer while requests are waiting for a slot raises the limit,
+  by one until the first push back (doubling it per round trip) and by one
+  per round trip after that
+- a push back halves the limit, at most once per round trip so a burst of
+  failures of requests that were already in flight counts as one
+- answers slower than LATENCY_TOLERANCE times the fastest recent answer
+  (and at least LATENCY_SLACK seconds slower) don't raise the limit, the
+  upstream is queueing
+
+Each limiter keeps the limit it converged on and the range it moved in, which
+get_concurrency_report returns per run.
+"""
+import time
+import threading
+
+LATENCY_TOLERANCE = 2.0
+# Jitter of very fast answers isn't queueing
+LATENCY_SLACK = 0.05
+BACKOFF_RATIO = 0.5
+# The latency baseline is the fastest answer of the last this many samples
+BASELINE_WINDOW = 100
+
+class AdaptiveLimiter:
+    def __init__(self, name, initial_limit, min_limit=1, max_limit=None):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit or initial_limit
+        self.limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = {
+            "initial_limit": int(self.limit),
+            "min_seen": int(self.limit),
+            "max_seen": int(self.limit),
+            "samples": 0,
+            "overloaded": 0,
+            "backoffs": 0,
+        }
+        self._baseline = None
+        self._window_min = None
+        self._window_samples = 0
+        self._last_backoff = 0.0
+        self._slow_start = True
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            self.waiting += 1
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.waiting -= 1
+            self.in_flight += 1
+
+    def release(self, latency, overloaded=False):
+        """Free the slot of a request that took latency seconds"""
+        now = time.monotonic()
+        with self._condition:
+            saturated = self.waiting or self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self.stats["samples"] += 1
+            if overloaded:
+                self.stats["overloaded"] += 1
+                # Requests started before the last back off report the same overload
+                if now - self._last_backoff > (self._baseline or latency):
+                    self.limit = max(self.min_limit, self.limit * BACKOFF_RATIO)
+                    self._last_backoff = now
+                    self._slow_start = False
+                    self.stats["backoffs"] += 1
+            else:
+                self._update_baseline(latency)
+                healthy = latency <= max(self._baseline * LATENCY_TOLERANCE, self._baseline + LATENCY_SLACK)
+                if saturated and healthy:
+                    self.limit = min(self.max_limit, self.limit + (1 if self._slow_start else 1 / self.limit))
+            self.stats["min_seen"] = min(self.stats["min_seen"], int(self.limit))
+            self.stats["max_seen"] = max(self.stats["max_seen"], int(self.limit))
+            self._condition.notify_all()
+
+    def _update_baseline(self, latency):
+        self._window_min = latency if self._window_min is None else min(self._window_min, latency)
+        self._window_samples += 1
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        if self._window_samples >= BASELINE_WINDOW:
+            # Let the baseline follow the upstream when it gets slower for good
+            self._baseline = self._window_min
+            self._window_min = None
+            self._window_samples = 0
+
+    def get_stats(self):
+        with self._condition:
+            return {**self.stats, "limit": int(self.limit), "max_limit": self.max_limit}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name, initial_limit, min_limit=1, max_limit=None):
+    """Return the shared limiter called name, created with the given limits on first use"""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveLimiter(name, initial_limit, min_limit=min_limit, max_limit=max_limit)
+        return _limiters[name]
+
+def get_concurrency_report():
+    """Return the stats of every limiter that was used in this run"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.get_stats() for limiter in limiters if limiter.stats["samples"]}
+
+def print_concurrency_report(report=None):
+    report = report or get_concurrency_report()
+    for name, stats in sorted(report.items()):
+        print(f"Concurrency {name}: converged on {stats['limit']} (started at {stats['initial_limit']}, "
+              f"range {stats['min_seen']}-{stats['max_seen']}, {stats['overloaded']} overloaded "
+              f"of {stats['samples']} requests)")
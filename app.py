@@ -1,13 +1,60 @@
-from get_data import run_arxiv_news, run_github_news, run_hackernews_news, run_reddit_news
-from make_email import main as make_email_main
-
-def main():
-    # Gets all the new data adds it to database and sends email
-    run_arxiv_news()
-    run_github_news()
-    run_hackernews_news()
-    run_reddit_news()
+import sys
+import time
+import argparse
+from get_data import SOURCES, get_source_stages, run_dag, print_stage_report
+from llm_cache import get_llm_cache_stats
+from llm_usage import print_usage_report, save_usage_report
+from adaptive_concurrency import print_concurrency_report
+
+# Upper bound on how many sources are scraped at the same time
+MAX_PARALLEL_SOURCES = 4
+
+def run_email():
+    # Imported lazily like the sources so `--sources` runs skip its dependencies
+    from make_email import main as make_email_main
     make_email_main()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch the daily AI news and send the newsletter")
+    parser.add_argument(
+        "--sources",
+        nargs="*",
+        choices=list(SOURCES),
+        default=list(SOURCES),
+        help="Sources to fetch (default: all). Pass no names to only build and send the email."
+    )
+    parser.add_argument("--no-email", action="store_true", help="Only fetch the sources, don't build or send the email")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Get all the new data, add it to the database and send the email. The email
+    still goes out when some sources failed, with the news of the others, but
+    is skipped when every source failed. Returns the exit status, 1 when any
+    stage failed or was skipped.
+    """
+    args = parse_args(argv)
+    start = time.perf_counter()
+    stages = get_source_stages(args.sources)
+    if not args.no_email:
+        stages["email"] = (run_email, list(stages))
+    results = run_dag(stages, max_workers=MAX_PARALLEL_SOURCES)
+    print_stage_report(results)
+    cache_stats = get_llm_cache_stats()
+    if cache_stats:
+        print(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['coalesced']} coalesced, {cache_stats['entries']} entries")
+    print_concurrency_report()
+    print_usage_report()
+    usage_path = save_usage_report()
+    if usage_path:
+        print(f"LLM usage report written to {usage_path}")
+    print(f"Pipeline finished in {time.perf_counter() - start:.1f}s")
+    failed = sorted(name for name, result in results.items() if result["status"] != "ok")
+    if failed:
+        print(f"Stages not completed: {', '.join(failed)}")
+        return 1
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
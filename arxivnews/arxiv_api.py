@@ -0,0 +1,77 @@
+"""
+Shared client of the arXiv export API.
+
+arXiv asks API clients for at most one request every three seconds
+(AGENTIC_NEWS_ARXIV_REQUEST_INTERVAL), across all the threads of a run. Every
+query and paper lookup goes through the one client returned by
+get_arxiv_client, whose session waits for a shared gate before each request.
+
+The arxiv library treats an empty first page as the end of the results, but
+arXiv now and then answers with an empty page for a query that has results.
+The client retries an empty first page like any other empty page and only
+accepts it once the retries are used up.
+"""
+import os
+import time
+import threading
+import arxiv
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# arXiv waits a few seconds between pages, fewer and larger pages save round trips
+ARXIV_PAGE_SIZE = 500
+ARXIV_REQUEST_INTERVAL = float(os.getenv("AGENTIC_NEWS_ARXIV_REQUEST_INTERVAL", "3"))
+
+class RequestGate:
+    """Spaces out the starts of requests made by several threads"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+_arxiv_gate = RequestGate(ARXIV_REQUEST_INTERVAL)
+
+class GatedSession(requests.Session):
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+
+    def get(self, url, **kwargs):
+        self.gate.wait()
+        return super().get(url, **kwargs)
+
+class ArxivClient(arxiv.Client):
+    def __init__(self, gate, page_size=ARXIV_PAGE_SIZE, num_retries=3):
+        # The gate spaces the requests, the client's own delay would only add to it
+        super().__init__(page_size=page_size, delay_seconds=0, num_retries=num_retries)
+        self._session = GatedSession(gate)
+
+    def _parse_feed(self, url, first_page=True, _try_index=0):
+        try:
+            return super()._parse_feed(url, first_page=False, _try_index=_try_index)
+        except arxiv.UnexpectedEmptyPageError as e:
+            if not first_page:
+                raise
+            print(f"arXiv answered an empty first page {self.num_retries + 1} times, taking it as no results: {url}")
+            return e.raw_feed
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_arxiv_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ArxivClient(_arxiv_gate)
+        return _client
@@ -1,66 +1,105 @@
 import arxiv
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from .get_mendeley_reader_counts import add_reader_counts
-from .generate_arxivnews_json import process_arxiv_papers_to_json
-from supabase import create_client, Client
+from .generate_arxivnews_json import process_arxiv_paper_to_json
+from .paper_store import ArxivPaper, load_paper_store
+from .arxiv_api import get_arxiv_client
+from db import get_supabase
 import os
 from dotenv import load_dotenv
+from source import Source
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Load environment variables for Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Comma separated, e.g. AGENTIC_NEWS_ARXIV_CATEGORIES=cs.AI,cs.LG,cs.CL,cs.CV
+ARXIV_CATEGORIES = [category.strip() for category in os.getenv("AGENTIC_NEWS_ARXIV_CATEGORIES", "cs.AI").split(",") if category.strip()]
+ARXIV_MAX_PARALLEL_QUERIES = 4
 
 def get_date_range():
     end_date = datetime.now().date() - timedelta(days=1)
     start_date = end_date - timedelta(days=7)
     return start_date, end_date
 
-def create_arxiv_query(start_date, end_date):
+def create_arxiv_query(start_date, end_date, category="cs.AI"):
     date_range = f"{start_date.strftime('%Y%m%d')}2359 TO {end_date.strftime('%Y%m%d')}2359"
-    return f"cat:cs.AI AND submittedDate:[{date_range}]"
+    return f"cat:{category} AND submittedDate:[{date_range}]"
 
 def fetch_arxiv_query(query):
-    search = arxiv.Search(
-        query=query,
-        max_results=None,
-        sort_by=arxiv.SortCriterion.SubmittedDate
-    )
-    return list(search.results())
+    # One search for the whole query, the client pages through it until arXiv's total result count
+    search = arxiv.Search(query=query, max_results=None, sort_by=arxiv.SortCriterion.SubmittedDate)
+    return get_arxiv_client().results(search)
 
 def strip_version(paper_id):
     return paper_id.split('v')[0] if 'v' in paper_id else paper_id
 
+def extract_paper_record(paper):
+    return ArxivPaper(strip_version(paper.get_short_id()), paper.primary_category, paper.title, paper.published.isoformat())
+
 def extract_paper_info(paper):
-    return {
-        'paper_id': strip_version(paper.get_short_id()),
-        'category': paper.primary_category,
-        'title': paper.title,
-    }
+    return extract_paper_record(paper).to_dict()
 
-def fetch_arxiv_data():
+def fetch_arxiv_category(category, start_date, end_date):
+    # Only the few fields we need are kept from every result
+    return [extract_paper_record(paper) for paper in fetch_arxiv_query(create_arxiv_query(start_date, end_date, category))]
+
+def fetch_arxiv_papers(categories=None):
+    categories = categories or ARXIV_CATEGORIES
     start_date, end_date = get_date_range()
-    query = create_arxiv_query(start_date, end_date)
-    papers = fetch_arxiv_query(query)
-    papers_info = [extract_paper_info(paper) for paper in papers]
+    store = load_paper_store(categories)
+    # Only the days since the last run are fetched, the rest of the window comes from the store
+    fetch_starts = {category: store.get_fetch_start(category, start_date) if store else start_date for category in categories}
+
+    def fetch(category):
+        try:
+            return category, fetch_arxiv_category(category, fetch_starts[category], end_date)
+        except Exception as e:
+            print(f"Error fetching arXiv category {category}: {e}")
+            return category, None
+
+    # Cross-listed papers come back from several categories, the ID keeps one copy
+    papers = store.papers if store else {}
+    with ThreadPoolExecutor(max_workers=min(len(categories), ARXIV_MAX_PARALLEL_QUERIES)) as executor:
+        for category, fetched in executor.map(fetch, categories):
+            if fetched is None:
+                continue
+            for paper in fetched:
+                papers[paper.paper_id] = paper
+            if store:
+                store.set_watermark(category, end_date)
+            print(f"arXiv {category}: fetched {len(fetched)} papers submitted since {fetch_starts[category]}")
+
+    if store:
+        store.prune(start_date)
+        store.save()
+        ordered = store.get_papers()
+    else:
+        ordered = sorted(papers.values(), key=lambda paper: paper.submitted, reverse=True)
+    print(f"arXiv: {len(ordered)} papers in the window")
+    for paper in ordered:
+        yield paper.to_dict()
+
+def fetch_arxiv_data():
+    papers_info = list(fetch_arxiv_papers())
     papers_info_with_reader_count = add_reader_counts(papers_info)
     return papers_info_with_reader_count
 
 def is_new_paper(paper_id, user_papers):
     if user_papers is None:
         return True
-    stripped_id = strip_version(paper_id)
-    return not any(stripped_id == strip_version(up) for up in user_papers)
+    if not isinstance(user_papers, (set, frozenset)):
+        user_papers = {strip_version(up) for up in user_papers}
+    return strip_version(paper_id) not in user_papers
 
 def is_in_user_categories(paper, user_categories):
     return paper['category'] in user_categories['categories']
 
 def filter_by_newness(papers, user_data):
     user_papers = user_data.get('papers')
+    # Stripped once, so the check stays linear in the number of papers
+    if user_papers is not None:
+        user_papers = {strip_version(up) for up in user_papers}
     return [paper for paper in papers if is_new_paper(paper['paper_id'], user_papers)]
 
 def filter_by_categories(new_papers, user_categories):
@@ -87,18 +126,36 @@ def add_arxiv_news_to_database(ai_posts):
         "posts": ai_posts,
     }
     try:
-        response = supabase.table("agentic_news_arxiv").insert(data).execute()
+        response = get_supabase().table("agentic_news_arxiv").insert(data).execute()
         print("Successfully added posts to database")
         return response
     except Exception as e:
         print(f"Error adding posts to database: {e}")
         return None
     
+class ArxivSource(Source):
+    name = "arxiv"
+    # Ranking by reader count needs every paper of the window
+    batch_size = None
+    workers = 3
+
+    def fetch(self):
+        return fetch_arxiv_papers()
+
+    def filter(self, batch):
+        return get_top_three_papers_by_reader_count(add_reader_counts(batch))
+
+    def enrich(self, item):
+        return process_arxiv_paper_to_json(item)
+
+    def persist(self, items):
+        return add_arxiv_news_to_database(items)
+
+    def item_key(self, item):
+        return item['paper_id']
+
 def main():
-    papers = fetch_arxiv_data()
-    top_three_papers = get_top_three_papers_by_reader_count(papers)
-    papers_json = process_arxiv_papers_to_json(top_three_papers)
-    add_arxiv_news_to_database(papers_json)
+    ArxivSource().run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -5,15 +5,17 @@ import json
 import requests
 import io
 import fitz  
-import tiktoken
 from dotenv import load_dotenv
 import resend
 import boto3
 from botocore.exceptions import NoCredentialsError
 from llm import call_llm
-import fitz
-import io
-from PIL import Image
+from http_client import http_get
+from model_routing import get_route
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .arxiv_api import get_arxiv_client
+from .pdf_processing import highlight_abstract_parts_in_pdf_as_image, extract_paper_text, process_pdf, IMAGE_CONTENT_TYPES, IMAGE_EXTENSIONS
 
 # Load environment variables from .env file
 load_dotenv()
@@ -26,10 +28,85 @@ def get_paper_info(paper_id):
         sort_by=arxiv.SortCriterion.Relevance
     )
     # Retrieve the first result
-    for result in search.results():
+    for result in get_arxiv_client().results(search):
         return result.title, result.summary  # Return title and abstract of the paper
     return None, None  # Return None if no paper is found
 
+class PaperArtifact:
+    """
+    Everything process_arxiv_paper_to_json needs of one paper. The metadata and
+    the PDF are fetched at most once and the PDF is parsed once, highlighting
+    and text extraction share the open document.
+    """
+
+    def __init__(self, paper_id):
+        self.paper_id = paper_id
+        self._values = {}
+        # functools.cached_property locks all instances at once before Python 3.12,
+        # one lock per value lets papers and the values of one paper load in parallel
+        self._locks = {name: threading.Lock() for name in ("metadata", "pdf_content", "document")}
+
+    def _load_once(self, name, load):
+        with self._locks[name]:
+            if name not in self._values:
+                self._values[name] = load()
+            return self._values[name]
+
+    @property
+    def metadata(self):
+        return self._load_once("metadata", self._fetch_metadata)
+
+    def _fetch_metadata(self):
+        # The shared client keeps the lookups of all workers within arXiv's request interval
+        search = arxiv.Search(id_list=[self.paper_id])
+        return next(get_arxiv_client().results(search), None)
+
+    @property
+    def title(self):
+        return self.metadata.title if self.metadata else None
+
+    @property
+    def abstract(self):
+        return self.metadata.summary if self.metadata else None
+
+    @property
+    def pdf_content(self):
+        return self._load_once("pdf_content", self._fetch_pdf_content)
+
+    def _fetch_pdf_content(self):
+        if self.metadata is not None and self.metadata.pdf_url:
+            try:
+                response = http_get(self.metadata.pdf_url, cache=True)
+                response.raise_for_status()
+                return response.content
+            except requests.RequestException as e:
+                print(f"Failed to download PDF: {e}")
+                return None
+        return download_pdf_content(self.paper_id)
+
+    @property
+    def document(self):
+        return self._load_once("document", self._open_document)
+
+    def _open_document(self):
+        if self.pdf_content is None:
+            return None
+        try:
+            return fitz.open(stream=self.pdf_content, filetype="pdf")
+        except Exception as e:
+            print(f"Failed to process PDF: {e}")
+            return None
+
+    def close(self):
+        if self._values.get("document") is not None:
+            self._values["document"].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 def extract_important_parts(abstract):
     prompt = f"""
     You are a helpful assistant that extracts the most important parts of an abstract from a paper. I want to highlight the text you are extracting later inside the PDF. 
@@ -50,8 +127,10 @@ def extract_important_parts(abstract):
     Return in JSON:
     """
     response = call_llm(
-        model="gpt-4o-mini",
+        task="short_summary",
         response_format={"type": "json_object"},
+        expected_keys=["text"],
+        call_site="arxiv.extract_important_parts",
         temperature=0.0,
         messages=[{"role": "user", "content": prompt}]
     )
@@ -62,7 +141,7 @@ def download_pdf_content(arxiv_id):
     pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
     
     try:
-        response = requests.get(pdf_url)
+        response = http_get(pdf_url, cache=True)
         response.raise_for_status()
         return response.content
     except requests.RequestException as e:
@@ -90,52 +169,11 @@ def get_first_page_pdf(arxiv_id):
         return None
     return extract_first_page(pdf_content)
 
-def highlight_abstract_parts_in_pdf_as_image(
-    pdf_content,
-    title_text,
-    important_parts,
-    dpi=300
-):
-    try:
-        # Open the PDF from the content
-        doc = fitz.open(stream=pdf_content, filetype="pdf")
-        page = doc[0]  # Access the first page of the document
-        
-        # Highlight the title text
-        title_instances = page.search_for(title_text)
-        if not title_instances:
-            print(f"Title text '{title_text}' not found on the page.")
-        for inst in title_instances:
-            highlight = page.add_highlight_annot(inst)
-            highlight.update()
-        
-        # Highlight the important parts from the abstract
-        for part in important_parts:
-            part_instances = page.search_for(part)
-            if not part_instances:
-                print(f"Important part '{part}' not found on the page.")
-            for inst in part_instances:
-                highlight = page.add_highlight_annot(inst)
-                highlight.update()
-        
-        # Render the page to an image with higher DPI
-        pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
-        # Convert the pixmap to a PIL Image
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        # Save the image to a bytes buffer
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='PNG')
-        img_byte_arr = img_byte_arr.getvalue()
-        doc.close()
-        return img_byte_arr, 'PNG'
-    except Exception as e:
-        print(f"Error processing PDF: {e}")
-        return None, None
-
-def upload_image_to_s3(image_content, bucket, object_name):
+def upload_image_to_s3(image_content, bucket, object_name, content_type=None):
     s3_client = boto3.client('s3')
     try:
-        s3_client.upload_fileobj(io.BytesIO(image_content), bucket, object_name)
+        extra_args = {'ContentType': content_type} if content_type else None
+        s3_client.upload_fileobj(io.BytesIO(image_content), bucket, object_name, ExtraArgs=extra_args)
         print(f"Upload Successful: {object_name} to {bucket}")
         return f"https://{bucket}.s3.amazonaws.com/{object_name}"
     except NoCredentialsError:
@@ -144,31 +182,12 @@ def upload_image_to_s3(image_content, bucket, object_name):
         print(f"An error occurred: {e}")
     return None
 
-def download_and_extract_paper_info(arxiv_id, token_limit=120000, model="gpt-3.5-turbo"):
+def download_and_extract_paper_info(arxiv_id, token_limit=None, model=None):
     try:
-        # Fetch paper metadata
-        search = arxiv.Search(id_list=[arxiv_id])
-        paper = next(search.results())
-        # Download PDF
-        response = requests.get(paper.pdf_url)
-        response.raise_for_status()
-        # Process PDF content
-        doc = fitz.open(stream=response.content, filetype="pdf")
-        encoding = tiktoken.encoding_for_model(model)
-        text = ""
-        tokens = []
-        for page in doc:
-            page_text = page.get_text()
-            new_tokens = encoding.encode(page_text, disallowed_special=())
-            if len(tokens) + len(new_tokens) > token_limit:
-                remaining = token_limit - len(tokens)
-                tokens.extend(new_tokens[:remaining])
-                break
-            tokens.extend(new_tokens)
-            text += page_text
-        return encoding.decode(tokens)
-    except requests.RequestException as e:
-        print(f"Failed to download PDF: {e}")
+        with PaperArtifact(arxiv_id) as paper:
+            if paper.document is None:
+                return None
+            return extract_paper_text(paper.document, token_limit, model)
     except Exception as e:
         print(f"An error occurred: {e}")
     return None
@@ -216,8 +235,10 @@ def summarize_paper(paper_text):
     Return in JSON:
     """
     summary_response = call_llm(
-        model="gpt-4o-mini",
+        task="long_summary",
         response_format={"type": "json_object"},
+        expected_keys=["insights", "problem", "solution", "results"],
+        call_site="arxiv.summarize_paper",
         temperature=0.0,
         messages=[
             {"role": "user", "content": summary_prompt}
@@ -228,44 +249,52 @@ def summarize_paper(paper_text):
 def make_url(paper_id):
     return f"https://arxiv.org/abs/{paper_id}"
 
-def process_arxiv_papers_to_json(paper_info_list):
-    papers_data = []  # List to hold all paper data
-    
-    for paper_info in paper_info_list:
-        paper_id = paper_info['paper_id']
-        url = make_url(paper_id)
-        title, abstract = get_paper_info(paper_id)
-        
-        if abstract:
+def process_arxiv_paper_to_json(paper_info):
+    paper_id = paper_info['paper_id']
+    url = make_url(paper_id)
+    # Metadata and PDF are fetched once and the PDF is parsed once for all steps below
+    with PaperArtifact(paper_id) as paper:
+        title, abstract = paper.title, paper.abstract
+
+        if not abstract:
+            print(f"Paper {paper_id} not found.")
+            return None
+
+        with ThreadPoolExecutor(max_workers=1) as io_executor:
+            # The PDF downloads while the LLM picks the parts to highlight
+            pdf_future = io_executor.submit(lambda: paper.pdf_content)
             important_parts = extract_important_parts(abstract)
-            pdf_content = get_first_page_pdf(paper_id)
-            
+
+            # Rendering and text extraction run in a worker process on one parse of the PDF
+            image_content, image_format, paper_text = process_pdf(pdf_future.result(), title, important_parts)
+
             # Generate unique ID for image
             unique_id = str(uuid.uuid4())
-            output_image_path = f"output_{unique_id}.png"
-            
-            # Generate and upload image
-            image_content, _ = highlight_abstract_parts_in_pdf_as_image(pdf_content, title, important_parts)
-            upload_image_to_s3(image_content, 'arxivgptnewsletter', output_image_path)
+            output_image_path = f"output_{unique_id}.{IMAGE_EXTENSIONS.get(image_format, 'png')}"
+
+            # The upload runs while the paper is summarized
+            upload_future = io_executor.submit(
+                upload_image_to_s3,
+                image_content,
+                'arxivgptnewsletter',
+                output_image_path,
+                IMAGE_CONTENT_TYPES.get(image_format)
+            )
             image_url = f"https://arxivgptnewsletter.s3.amazonaws.com/{output_image_path}"
-            
-            # Get paper summary
-            paper_text = download_and_extract_paper_info(paper_id)
             bullet_points = summarize_paper(paper_text)
-            
-            # Create paper data structure
-            paper_data = {
-                "title": title,
-                "paper_url": url,
-                "image_url": image_url,
-                "ai_summary": bullet_points
-            }
-            
-            papers_data.append(paper_data)
-        else:
-            print(f"Paper {paper_id} not found.")
+            upload_future.result()
     
-    return papers_data
+    # Create paper data structure
+    return {
+        "title": title,
+        "paper_url": url,
+        "image_url": image_url,
+        "ai_summary": bullet_points
+    }
+
+def process_arxiv_papers_to_json(paper_info_list):
+    papers_data = [process_arxiv_paper_to_json(paper_info) for paper_info in paper_info_list]
+    return [paper_data for paper_data in papers_data if paper_data is not None]
 
 # Example usage:
 # if __name__ == "__main__":
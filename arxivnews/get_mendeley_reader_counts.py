@@ -30,9 +30,12 @@ curl -X POST https://api.mendeley.com/oauth/token \
 """
 import os
 import json
-import subprocess
+import time
+import threading
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from http_client import http_request
+from .reader_count_store import get_reader_count_store
 
 # Load environment variables
 load_dotenv()
@@ -41,67 +44,145 @@ load_dotenv()
 MENDELEY_REFRESH_TOKEN = os.getenv("MENDELEY_REFRESH_TOKEN")
 MENDELEY_CLIENT_ID = os.getenv("MENDELEY_CLIENT_ID")
 MENDELEY_CLIENT_SECRET = os.getenv("MENDELEY_CLIENT_SECRET")
+# The access token is kept here between runs, an empty value keeps it in memory only
+MENDELEY_TOKEN_PATH = os.getenv("AGENTIC_NEWS_MENDELEY_TOKEN_CACHE", ".mendeley_token.json")
 
-def get_access_token():
-    # Check if all required variables are set
-    if not all([MENDELEY_REFRESH_TOKEN, MENDELEY_CLIENT_ID, MENDELEY_CLIENT_SECRET]):
-        raise ValueError("Missing required environment variables. Please check your .env file.")
-
-    command = [
-        "curl", "-X", "POST", "https://api.mendeley.com/oauth/token",
-        "-d", f"grant_type=refresh_token",
-        "-d", f"refresh_token={MENDELEY_REFRESH_TOKEN}",
-        "-d", f"client_id={MENDELEY_CLIENT_ID}",
-        "-d", f"client_secret={MENDELEY_CLIENT_SECRET}"
-    ]
+MENDELEY_API = "https://api.mendeley.com"
+MENDELEY_ACCEPT = "application/vnd.mendeley-document.1+json"
+# Refresh the token this many seconds before it expires
+TOKEN_EXPIRY_MARGIN = 60
 
-    result = subprocess.run(command, capture_output=True, text=True)
-    response_data = json.loads(result.stdout)
-    access_token = response_data.get("access_token")
-    return access_token
+class MendeleyClient:
+    """
+    Mendeley catalog client on the shared keep-alive HTTP transport.
 
-def get_paper_id(arxiv_id, access_token):
-    command = f"curl 'https://api.mendeley.com/catalog?arxiv={arxiv_id}' " \
-              f"-H 'Authorization: Bearer {access_token}' " \
-              "-H 'Accept: application/vnd.mendeley-document.1+json'"
+    The OAuth access token is cached with its expiry (on disk when token_path is
+    set), refreshed shortly before it expires and once more when a request comes
+    back 401. 429 answers are retried after Retry-After by the transport.
+    """
 
-    result = subprocess.run(command, shell=True, capture_output=True, text=True)
-    
-    # Add error handling and debugging
-    if result.returncode != 0:
-        print(f"Error executing curl command: {result.stderr}")
-        return None
+    def __init__(self, refresh_token, client_id, client_secret, token_path=None):
+        self.refresh_token = refresh_token
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_path = token_path
+        self._access_token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        self._load_token()
 
-    try:
-        response_data = json.loads(result.stdout)
-        if not response_data:  # Check if the list is empty
-            return None
-        return response_data[0].get("id")
-    except json.JSONDecodeError:
-        print(f"Failed to parse JSON. Raw output: {result.stdout}")
-        return None
+    def _load_token(self):
+        if not self.token_path:
+            return
+        try:
+            with open(self.token_path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        # Mendeley may rotate the refresh token, the latest one is stored with the access token
+        if stored.get("client_id") == self.client_id:
+            self._access_token = stored.get("access_token")
+            self._expires_at = stored.get("expires_at", 0)
+            self.refresh_token = stored.get("refresh_token") or self.refresh_token
 
-def get_reader_count(access_token, paper_id):
-    try:
-        command = f"curl 'https://api.mendeley.com/catalog/{paper_id}?view=stats' " \
-                  f"-H 'Authorization: Bearer {access_token}' " \
-                  "-H 'Accept: application/vnd.mendeley-document.1+json'"
+    def _save_token(self):
+        if not self.token_path:
+            return
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                "client_id": self.client_id,
+                "access_token": self._access_token,
+                "refresh_token": self.refresh_token,
+                "expires_at": self._expires_at,
+            }, f)
 
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+    def _refresh(self):
+        if not all([self.refresh_token, self.client_id, self.client_secret]):
+            raise ValueError("Missing required environment variables. Please check your .env file.")
+        response = http_request("POST", f"{MENDELEY_API}/oauth/token", data={
+            "grant_type": "refresh_token",
+            "refresh_token": self.refresh_token,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+        })
+        response.raise_for_status()
+        token = response.json()
+        self._access_token = token["access_token"]
+        self._expires_at = time.time() + float(token.get("expires_in", 3600))
+        self.refresh_token = token.get("refresh_token") or self.refresh_token
+        self._save_token()
 
-        if result.returncode != 0:
-            print(f"Error executing curl command: {result.stderr}")
-            return 0
+    def get_access_token(self, force_refresh=False, stale_token=None):
+        with self._lock:
+            # Another thread may have refreshed already while this one waited for the lock
+            expired = time.time() > self._expires_at - TOKEN_EXPIRY_MARGIN
+            if self._access_token is None or expired or (force_refresh and self._access_token == stale_token):
+                self._refresh()
+            return self._access_token
+
+    def get(self, path, params=None):
+        """GET a catalog path, return the parsed JSON or None when it wasn't found"""
+        access_token = self.get_access_token()
+        response = self._get(path, params, access_token)
+        if response.status_code == 401:
+            access_token = self.get_access_token(force_refresh=True, stale_token=access_token)
+            response = self._get(path, params, access_token)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def _get(self, path, params, access_token):
+        # The shared session retries 429 and 5xx, another retry loop here would multiply the attempts
+        return http_request("GET", f"{MENDELEY_API}{path}", params=params, headers={
+            "Authorization": f"Bearer {access_token}",
+            "Accept": MENDELEY_ACCEPT,
+        })
+
+    def get_paper_id(self, arxiv_id):
+        documents = self.get("/catalog", params={"arxiv": arxiv_id})
+        if not documents:
+            return None
+        return documents[0].get("id")
 
-        response_data = json.loads(result.stdout)
-        
-        reader_count = response_data.get("reader_count")
+    def get_reader_count(self, paper_id):
+        stats = self.get(f"/catalog/{paper_id}", params={"view": "stats"})
+        reader_count = (stats or {}).get("reader_count")
         if reader_count is None:
             print(f"No reader count available for paper_id: {paper_id}")
             return 0
-        
         return reader_count
 
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MendeleyClient(
+                MENDELEY_REFRESH_TOKEN,
+                MENDELEY_CLIENT_ID,
+                MENDELEY_CLIENT_SECRET,
+                token_path=MENDELEY_TOKEN_PATH or None
+            )
+        return _client
+
+def get_access_token():
+    return get_client().get_access_token()
+
+def get_paper_id(arxiv_id, access_token=None):
+    # The client keeps its own token fresh, access_token is kept for compatibility
+    try:
+        return get_client().get_paper_id(arxiv_id)
+    except Exception as e:
+        print(f"Error getting Mendeley id for {arxiv_id}: {e}")
+        return None
+
+def get_reader_count(access_token, paper_id):
+    try:
+        return get_client().get_reader_count(paper_id)
     except Exception as e:
         print(f"An error occurred while getting reader count for paper_id {paper_id}: {str(e)}")
         return 0
@@ -118,6 +199,37 @@ def add_reader_count_to_paper(paper, access_token):
     return {**paper, 'reader_count': reader_count}
 
 def add_reader_counts(papers, max_workers=100):
+    store = get_reader_count_store()
+    if store is None:
+        return _add_reader_counts_uncached(papers, max_workers)
+
+    # Only new papers, catalog misses and stale counts go to Mendeley
+    now = time.time()
+    arxiv_ids = list(dict.fromkeys(paper['paper_id'] for paper in papers))
+    rows = store.get_many(arxiv_ids)
+    to_lookup = [arxiv_id for arxiv_id in arxiv_ids if store.needs_catalog_lookup(rows.get(arxiv_id), now)]
+    looked_up = lookup_paper_ids(to_lookup, max_workers)
+    store.save_catalog_ids(looked_up)
+    paper_ids = {arxiv_id: row['catalog_id'] for arxiv_id, row in rows.items() if row['catalog_id']}
+    paper_ids.update({arxiv_id: paper_id for arxiv_id, paper_id in looked_up.items() if paper_id})
+
+    reader_counts = {arxiv_id: row['reader_count'] for arxiv_id, row in rows.items() if row['reader_count'] is not None}
+    to_count = [
+        arxiv_id for arxiv_id in arxiv_ids
+        if arxiv_id in paper_ids and (arxiv_id in looked_up or store.needs_reader_count(rows.get(arxiv_id), now))
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        counted = dict(zip(to_count, executor.map(fetch_reader_count, (paper_ids[arxiv_id] for arxiv_id in to_count))))
+    counted = {arxiv_id: reader_count for arxiv_id, reader_count in counted.items() if reader_count is not None}
+    store.save_reader_counts(counted)
+    reused = len(set(reader_counts) & set(arxiv_ids) - set(to_count))
+    reader_counts.update(counted)
+
+    print(f"Mendeley: {len(to_lookup)} catalog lookups, {len(counted)} reader counts fetched, "
+          f"{reused} reader counts reused from the store")
+    return [{**paper, 'reader_count': reader_counts.get(paper['paper_id'], 0)} for paper in papers]
+
+def _add_reader_counts_uncached(papers, max_workers=100):
     access_token = get_access_token()
     arxiv_ids = [paper['paper_id'] for paper in papers]
     paper_ids = get_paper_ids_parallel(arxiv_ids, access_token, max_workers)
@@ -130,6 +242,31 @@ def add_reader_counts(papers, max_workers=100):
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         return list(executor.map(process_paper, papers))
 
+def fetch_reader_count(mendeley_paper_id):
+    """Return the reader count, or None when it couldn't be fetched"""
+    try:
+        return get_client().get_reader_count(mendeley_paper_id)
+    except Exception as e:
+        print(f"An error occurred while getting reader count for paper_id {mendeley_paper_id}: {str(e)}")
+        return None
+
+def lookup_paper_ids(arxiv_ids, max_workers=100):
+    """
+    Return {arxiv_id: Mendeley id} of the answered lookups, None for papers
+    that aren't in the catalog. Failed lookups are left out.
+    """
+    client = get_client()
+    paper_ids = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_arxiv = {executor.submit(client.get_paper_id, arxiv_id): arxiv_id for arxiv_id in arxiv_ids}
+        for future in as_completed(future_to_arxiv):
+            arxiv_id = future_to_arxiv[future]
+            try:
+                paper_ids[arxiv_id] = future.result()
+            except Exception as exc:
+                print(f'{arxiv_id} generated an exception: {exc}')
+    return paper_ids
+
 def get_paper_ids_parallel(arxiv_ids, access_token, max_workers=100):
     paper_ids = {}
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
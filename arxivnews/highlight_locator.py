@@ -0,0 +1,65 @@
+"""
+Locates text spans on a PDF page for highlighting.
+
+page.search_for rescans the page for every span and only finds exact
+matches, so a span the LLM copied across a hyphenated line break, a ligature
+(fi, fl) or different spacing was lost. Here the words of the page are read
+once with their coordinates and joined into one normalized string that keeps
+only letters and digits (NFKC folded, case folded), remembering which word
+every character came from. Spans are normalized the same way and looked up
+in that string, so hyphenation, ligatures, line breaks and whitespace no
+longer matter. A match has to start at the first character of a word and end
+at the last character of one, so "graph" is not found inside "paragraph".
+Every match becomes one quad per line of words it covers.
+"""
+import unicodedata
+import fitz
+
+def normalize(text):
+    return "".join(char for char in unicodedata.normalize("NFKC", text).casefold() if char.isalnum())
+
+class PageIndex:
+    def __init__(self, page):
+        self.words = page.get_text("words")
+        parts = []
+        # Index of the word every character of the normalized text belongs to
+        self.owners = []
+        for index, word in enumerate(self.words):
+            normalized = normalize(word[4])
+            parts.append(normalized)
+            self.owners.extend([index] * len(normalized))
+        self.text = "".join(parts)
+
+    def find(self, span):
+        """Return the quads of every occurrence of span, one per covered line"""
+        needle = normalize(span)
+        if not needle:
+            return []
+        quads = []
+        start = self.text.find(needle)
+        while start != -1:
+            end = start + len(needle)
+            if self._is_whole_words(start, end):
+                quads.extend(self._quads(self.owners[start], self.owners[end - 1]))
+                start = self.text.find(needle, end)
+            else:
+                start = self.text.find(needle, start + 1)
+        return quads
+
+    def _is_whole_words(self, start, end):
+        starts_word = start == 0 or self.owners[start - 1] != self.owners[start]
+        ends_word = end == len(self.text) or self.owners[end] != self.owners[end - 1]
+        return starts_word and ends_word
+
+    def _quads(self, first_word, last_word):
+        lines = {}
+        for x0, y0, x1, y1, _, block, line, _ in self.words[first_word:last_word + 1]:
+            rect = fitz.Rect(x0, y0, x1, y1)
+            key = (block, line)
+            lines[key] = lines[key] | rect if key in lines else rect
+        return [rect.quad for rect in lines.values()]
+
+def locate_spans(page, spans):
+    """Return the quads of every span on page, in the order of spans"""
+    index = PageIndex(page)
+    return [index.find(span) for span in spans]
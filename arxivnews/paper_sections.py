@@ -0,0 +1,62 @@
+"""
+Section headings of paper text.
+
+A heading is a short numbered line ("3 Method", "3.1. Approach", "IV. RESULTS",
+"B Appendix"). A known section name maps to its section kind. A top level
+numbered heading with any other title ("3 StructPlan: Planning Tool Calls")
+is "body", the paper's own name for its method or results. Words like
+"Model", "Analysis" or "Appendix" alone on a line are usually table headers
+or labels, so only the names in UNNUMBERED_NAMES are headings without a
+number. Text before the first heading (title, authors, abstract without a
+heading) belongs to "abstract". Everything from the references on is back
+matter and is never needed for a summary.
+"""
+import re
+
+SECTION_NAMES = {
+    "abstract": ["abstract"],
+    "introduction": ["introduction", "motivation"],
+    "related": ["related work", "related works", "background", "preliminaries"],
+    "method": [
+        "method", "methods", "methodology", "approach", "our approach", "proposed method",
+        "proposed approach", "model", "framework", "system design", "problem formulation",
+    ],
+    "results": [
+        "results", "experiments", "experimental results", "experiments and results",
+        "evaluation", "experimental setup", "analysis",
+    ],
+    "discussion": ["discussion", "limitations"],
+    "conclusion": [
+        "conclusion", "conclusions", "conclusion and future work", "conclusions and future work",
+        "summary", "future work",
+    ],
+    "references": [
+        "references", "bibliography", "acknowledgments", "acknowledgements", "acknowledgment",
+        "appendix", "supplementary material",
+    ],
+}
+
+# Names that papers print as headings without a number
+UNNUMBERED_NAMES = {
+    "abstract", "references", "bibliography", "acknowledgments", "acknowledgements", "acknowledgment",
+}
+
+_SECTION_KINDS = {name: kind for kind, names in SECTION_NAMES.items() for name in names}
+_HEADING = re.compile(
+    r"^\s*((?:\d+(?:\.\d+)*|[IVX]+|[A-H])[.:]?\s+)?([A-Za-z][A-Za-z ]{2,40}?)\s*[.:]?\s*$"
+)
+# "3 Title" or "III. TITLE", subsections ("3.2 Title") stay in their section
+_TOP_LEVEL_HEADING = re.compile(r"^\s*(?:\d+|[IVX]+)\.?\s+[A-Z][\w\s:,&'/()-]{2,55}$")
+
+def section_of_heading(line):
+    """Return the section kind of a heading line, or None when it isn't one"""
+    if len(line) > 60:
+        return None
+    match = _HEADING.match(line)
+    if match:
+        name = " ".join(match.group(2).lower().split())
+        if name in _SECTION_KINDS and (match.group(1) or name in UNNUMBERED_NAMES):
+            return _SECTION_KINDS[name]
+    if _TOP_LEVEL_HEADING.match(line):
+        return "body"
+    return None
@@ -0,0 +1,110 @@
+"""
+Local store of the arXiv papers in the ranking window.
+
+The window is seven days wide but only the newest day changes between daily
+runs. The store keeps the papers of the window together with a watermark per
+category, the end of the last fetched date range, so the next run only asks
+arXiv for papers submitted since then. A category that was just added is
+fetched for the whole window, removing one empties the store. Papers show up
+in the API only once they are announced, which for papers submitted on Friday
+or over the weekend is the next Monday or later around holidays. So the
+query reaches back AGENTIC_NEWS_ARXIV_OVERLAP_DAYS (default 4) before the
+watermark and duplicates are merged by ID.
+
+AGENTIC_NEWS_ARXIV_STORE sets the file (default .arxiv_papers.json), an empty
+value disables the store and every run fetches the whole window.
+"""
+import os
+import json
+import tempfile
+from datetime import date, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ARXIV_STORE_PATH = os.getenv("AGENTIC_NEWS_ARXIV_STORE", ".arxiv_papers.json")
+ARXIV_OVERLAP = timedelta(days=int(os.getenv("AGENTIC_NEWS_ARXIV_OVERLAP_DAYS", "4")))
+
+class ArxivPaper:
+    """The fields of an arXiv result the pipeline uses"""
+    __slots__ = ("paper_id", "category", "title", "submitted")
+
+    def __init__(self, paper_id, category, title, submitted):
+        self.paper_id = paper_id
+        self.category = category
+        self.title = title
+        # ISO timestamp of the first version
+        self.submitted = submitted
+
+    def to_dict(self):
+        return {'paper_id': self.paper_id, 'category': self.category, 'title': self.title}
+
+    def to_row(self):
+        return [self.paper_id, self.category, self.title, self.submitted]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+class PaperStore:
+    def __init__(self, path, categories):
+        self.path = path
+        self.watermarks = {}
+        self.papers = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+            self.watermarks = {category: date.fromisoformat(day) for category, day in stored.get("watermarks", {}).items()}
+            self.papers = {row[0]: ArxivPaper.from_row(row) for row in stored.get("papers", [])}
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Ignoring corrupt arXiv store {path}: {e}")
+        # Papers of a category that is no longer fetched can't be told apart from the others
+        if set(self.watermarks) - set(categories):
+            self.watermarks = {}
+            self.papers = {}
+
+    def get_fetch_start(self, category, start_date):
+        """Return the start of the date range of category that still has to be fetched"""
+        watermark = self.watermarks.get(category)
+        if watermark is None:
+            return start_date
+        return max(start_date, watermark - ARXIV_OVERLAP)
+
+    def set_watermark(self, category, watermark):
+        self.watermarks[category] = watermark
+
+    def add(self, paper):
+        self.papers[paper.paper_id] = paper
+
+    def prune(self, start_date):
+        """Drop the papers submitted before the window"""
+        # The window starts after the last minute of start_date
+        first_day = (start_date + timedelta(days=1)).isoformat()
+        self.papers = {paper_id: paper for paper_id, paper in self.papers.items() if paper.submitted >= first_day}
+
+    def get_papers(self):
+        """Return the papers newest first, the order of the arXiv query"""
+        return sorted(self.papers.values(), key=lambda paper: paper.submitted, reverse=True)
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a half written store
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({
+                    "watermarks": {category: day.isoformat() for category, day in self.watermarks.items()},
+                    "papers": [paper.to_row() for paper in self.get_papers()],
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+def load_paper_store(categories):
+    """Return the store of the categories, or None when it is disabled"""
+    path = os.getenv("AGENTIC_NEWS_ARXIV_STORE", ARXIV_STORE_PATH)
+    return PaperStore(path, categories) if path else None
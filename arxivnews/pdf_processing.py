@@ -0,0 +1,254 @@
+"""
+CPU bound PDF work of the arXiv enrichment.
+
+Rendering the highlighted first page and extracting the token budgeted text
+hold the GIL, so process_pdf runs them in a pool of worker processes while
+the threads of the arXiv source wait on downloads and LLM calls. The workers
+only import this module, fitz and the tokenizer.
+
+AGENTIC_NEWS_PDF_WORKERS sets the number of processes (default: the CPU
+count, at most 4), 0 runs the work in the calling thread.
+AGENTIC_NEWS_PDF_TIMEOUT is the number of seconds a paper may take in the pool
+(default 120), a paper that takes longer is skipped and the pool replaced.
+
+The image in the email only needs the title and the highlighted abstract, so
+the page is clipped to that region and rendered at the resolution of the
+target width instead of 300 dpi for the whole page. It is encoded straight
+from the fitz pixmap as JPEG (or WebP) with the quality lowered, and the size
+after that, until it fits the byte budget. AGENTIC_NEWS_PAPER_IMAGE_FORMAT
+(JPEG, WEBP or PNG), AGENTIC_NEWS_PAPER_IMAGE_WIDTH (pixels, default 1600)
+and AGENTIC_NEWS_PAPER_IMAGE_MAX_KB (default 250) tune it.
+
+The paper text for the summary is read page by page and leaves out the
+sections in AGENTIC_NEWS_PAPER_SKIP_SECTIONS (default related, the related
+work and background), sections under headings it doesn't know are kept.
+Reading stops at the references or at AGENTIC_NEWS_PAPER_TEXT_TOKENS
+(default 30000), less when the summary model's tokens per minute (see
+model_routing) can't take that much in one request.
+"""
+import io
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import fitz
+from PIL import Image
+from model_routing import get_route, get_rate_limits
+from token_budget import count_tokens, truncate_head
+from .highlight_locator import locate_spans
+from .paper_sections import section_of_heading
+
+PDF_WORKERS = int(os.getenv("AGENTIC_NEWS_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_TIMEOUT = float(os.getenv("AGENTIC_NEWS_PDF_TIMEOUT", "120"))
+
+PAPER_IMAGE_FORMAT = os.getenv("AGENTIC_NEWS_PAPER_IMAGE_FORMAT", "JPEG").upper()
+# The email shows the image about 800 px wide, twice that stays sharp on high density screens
+PAPER_IMAGE_WIDTH = int(os.getenv("AGENTIC_NEWS_PAPER_IMAGE_WIDTH", "1600"))
+PAPER_IMAGE_MAX_BYTES = int(os.getenv("AGENTIC_NEWS_PAPER_IMAGE_MAX_KB", "250")) * 1024
+IMAGE_CONTENT_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+IMAGE_EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp"}
+
+# Points of page kept around the title and the highlights
+CLIP_MARGIN = 24
+MAX_DPI = 300
+MIN_IMAGE_WIDTH = 600
+IMAGE_QUALITIES = (85, 75, 65, 55, 45)
+
+# Sections of a paper the summary leaves out, see paper_sections.SECTION_NAMES
+PAPER_SKIP_SECTIONS = [
+    section.strip()
+    for section in os.getenv("AGENTIC_NEWS_PAPER_SKIP_SECTIONS", "related").split(",")
+    if section.strip()
+]
+PAPER_TEXT_TOKENS = int(os.getenv("AGENTIC_NEWS_PAPER_TEXT_TOKENS", "30000"))
+# Tokens of the summary prompt and answer next to the paper text in one request
+PAPER_PROMPT_TOKENS = 3000
+
+def get_clip(page, rects, margin=CLIP_MARGIN):
+    """Return the region of page around rects, the whole page when there are none"""
+    if not rects:
+        return page.rect
+    clip = fitz.Rect(rects[0])
+    for rect in rects[1:]:
+        clip |= rect
+    return (clip + (-margin, -margin, margin, margin)) & page.rect
+
+def encode_pixmap(pix, image_format, quality=None):
+    if image_format == "PNG":
+        return pix.tobytes("png")
+    if image_format == "JPEG":
+        return pix.tobytes("jpeg", jpg_quality=quality or IMAGE_QUALITIES[0])
+    # fitz has no WebP encoder, PIL reads the pixmap samples without copying them
+    img = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride, 1)
+    output = io.BytesIO()
+    img.save(output, format=image_format, quality=quality or IMAGE_QUALITIES[0])
+    return output.getvalue()
+
+def render_region(page, clip, width, image_format, max_bytes=None):
+    """Render clip of page width pixels wide, lowering quality and then size until it fits max_bytes"""
+    qualities = (None,) if image_format == "PNG" else IMAGE_QUALITIES
+    last_width = None
+    while True:
+        zoom = min(width / clip.width, MAX_DPI / 72)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+        for quality in qualities:
+            image_content = encode_pixmap(pix, image_format, quality)
+            if max_bytes is None or len(image_content) <= max_bytes:
+                return image_content
+        # fitz rounds the pixmap up, so the minimum width can come out a pixel wider every time
+        if pix.width <= MIN_IMAGE_WIDTH or (last_width is not None and pix.width >= last_width):
+            print(f"Image is {len(image_content)} bytes at {pix.width} px, over the budget of {max_bytes}")
+            return image_content
+        last_width = pix.width
+        width = max(MIN_IMAGE_WIDTH, int(pix.width * 0.75))
+
+def highlight_abstract_parts_in_pdf_as_image(
+    pdf_content,
+    title_text,
+    important_parts,
+    dpi=300,
+    target_width=None,
+    image_format="PNG",
+    max_bytes=None,
+    clip_to_highlights=False
+):
+    # pdf_content is the PDF bytes or an open document, which is left open
+    owns_doc = not isinstance(pdf_content, fitz.Document)
+    try:
+        # Open the PDF from the content
+        doc = fitz.open(stream=pdf_content, filetype="pdf") if owns_doc else pdf_content
+        page = doc[0]  # Access the first page of the document
+        highlighted = []
+
+        # The title and all parts are located in one index of the page words
+        title_quads, *part_quads = locate_spans(page, [title_text, *important_parts])
+        if not title_quads:
+            print(f"Title text '{title_text}' not found on the page.")
+        for part, quads in zip(important_parts, part_quads):
+            if not quads:
+                print(f"Important part '{part}' not found on the page.")
+        for quads in [title_quads, *part_quads]:
+            if quads:
+                highlight = page.add_highlight_annot(quads=quads)
+                highlight.update()
+                highlighted.extend(quad.rect for quad in quads)
+        if important_parts:
+            found = sum(1 for quads in part_quads if quads)
+            print(f"Highlighted {found} of {len(important_parts)} important parts ({found / len(important_parts):.0%})")
+
+        clip = get_clip(page, highlighted) if clip_to_highlights else page.rect
+        # The resolution follows the target width, without one the page is rendered at dpi
+        width = target_width or clip.width * dpi / 72
+        image_content = render_region(page, clip, width, image_format.upper(), max_bytes)
+        if owns_doc:
+            doc.close()
+        return image_content, image_format.upper()
+    except Exception as e:
+        print(f"Error processing PDF: {e}")
+        return None, None
+
+def extract_paper_text(doc, token_limit=None, model=None, skip_sections=None):
+    """
+    Return the text of doc without skip_sections within token_limit tokens.
+    Pages are read one at a time and reading stops at the references or when
+    the budget is used up.
+    """
+    # Budget and tokenizer of the model that summarizes the paper
+    route = get_route("long_summary")
+    model = model or route["model"]
+    if not token_limit:
+        token_limit = min(PAPER_TEXT_TOKENS, route["max_input_tokens"])
+        rate_limits = get_rate_limits(model)
+        if rate_limits:
+            # The whole request has to fit in the model's tokens per minute
+            token_limit = min(token_limit, rate_limits[1] - PAPER_PROMPT_TOKENS)
+    skip_sections = set(PAPER_SKIP_SECTIONS if skip_sections is None else skip_sections)
+    parts = []
+    used_tokens = 0
+    section = "abstract"
+    pages_read = 0
+    for page in doc:
+        pages_read += 1
+        kept = []
+        done = False
+        for line in page.get_text().splitlines():
+            section = section_of_heading(line) or section
+            if section == "references":
+                done = True
+                break
+            if section not in skip_sections:
+                kept.append(line)
+        page_text = "\n".join(kept)
+        if page_text:
+            page_tokens = count_tokens(page_text, model)
+            if used_tokens + page_tokens > token_limit:
+                parts.append(truncate_head(page_text, token_limit - used_tokens, model))
+                used_tokens = token_limit
+                done = True
+            else:
+                parts.append(page_text)
+                used_tokens += page_tokens
+        if done:
+            break
+    print(f"Paper text: {used_tokens} tokens from {pages_read} of {len(doc)} pages")
+    return "\n".join(parts)
+
+def render_and_extract(pdf_content, title_text, important_parts):
+    """Parse the PDF once, return the highlighted image, its format and the paper text"""
+    try:
+        doc = fitz.open(stream=pdf_content, filetype="pdf")
+    except Exception as e:
+        print(f"Failed to process PDF: {e}")
+        return None, None, None
+    try:
+        image_content, image_format = highlight_abstract_parts_in_pdf_as_image(
+            doc,
+            title_text,
+            important_parts,
+            target_width=PAPER_IMAGE_WIDTH,
+            image_format=PAPER_IMAGE_FORMAT,
+            max_bytes=PAPER_IMAGE_MAX_BYTES,
+            clip_to_highlights=True
+        )
+        return image_content, image_format, extract_paper_text(doc)
+    finally:
+        doc.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pdf_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a process that runs threads can copy locks in a held state
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _reset_pdf_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+def process_pdf(pdf_content, title_text, important_parts):
+    """Return (image bytes, image format, paper text) of a PDF, Nones when it can't be processed"""
+    if pdf_content is None:
+        return None, None, None
+    if PDF_WORKERS <= 0:
+        return render_and_extract(pdf_content, title_text, important_parts)
+    pool = get_pdf_pool()
+    try:
+        return pool.submit(render_and_extract, pdf_content, title_text, important_parts).result(timeout=PDF_TIMEOUT)
+    except TimeoutError:
+        # The stuck worker keeps its slot, later papers get a new pool
+        print(f"PDF processing took longer than {PDF_TIMEOUT:g}s, skipping the paper")
+        _reset_pdf_pool(pool)
+        return None, None, None
+    except BrokenProcessPool as e:
+        # A PDF that crashes its worker only fails its own paper
+        print(f"PDF worker died: {e}")
+        _reset_pdf_pool(pool)
+        return None, None, None
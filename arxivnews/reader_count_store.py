@@ -0,0 +1,132 @@
+"""
+Persistent store of Mendeley lookups keyed by arXiv ID.
+
+The arXiv window is seven days wide, so six of every seven papers were already
+looked up the day before. The Mendeley catalog ID of a paper never changes and
+is kept forever. A paper that isn't in the catalog yet is asked for again after
+a day, it usually shows up once it gets its first readers. Reader counts keep
+their fetch time and are fetched again once they are older than the maximum
+age minus an hour of slack, so a daily run that starts a little earlier than
+the one before still refreshes them.
+
+AGENTIC_NEWS_READER_COUNT_STORE sets the SQLite file (default
+.reader_counts.sqlite, an empty value disables the store) and
+AGENTIC_NEWS_READER_COUNT_MAX_AGE_HOURS the age after which a reader count is
+stale (default 24).
+"""
+import os
+import time
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+READER_COUNT_STORE_PATH = os.getenv("AGENTIC_NEWS_READER_COUNT_STORE", ".reader_counts.sqlite")
+READER_COUNT_MAX_AGE = float(os.getenv("AGENTIC_NEWS_READER_COUNT_MAX_AGE_HOURS", "24")) * 60 * 60
+# Papers missing from the catalog are looked up again after this many seconds
+CATALOG_MISS_TTL = 24 * 60 * 60
+# Scheduled runs don't start at the exact same time every day
+RUN_TIME_SLACK = 60 * 60
+
+class ReaderCountStore:
+    def __init__(self, path, max_age=READER_COUNT_MAX_AGE, catalog_miss_ttl=CATALOG_MISS_TTL):
+        self.path = path
+        self.max_age = max_age
+        self.catalog_miss_ttl = catalog_miss_ttl
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                arxiv_id TEXT PRIMARY KEY,
+                catalog_id TEXT,
+                catalog_checked_at REAL,
+                reader_count INTEGER,
+                counted_at REAL
+            )
+            """
+        )
+        self._db.commit()
+
+    def get_many(self, arxiv_ids):
+        """Return the stored row of every known arxiv id"""
+        rows = {}
+        arxiv_ids = list(arxiv_ids)
+        with self._lock:
+            # Stay below SQLite's limit on query parameters
+            for start in range(0, len(arxiv_ids), 500):
+                chunk = arxiv_ids[start:start + 500]
+                cursor = self._db.execute(
+                    f"SELECT arxiv_id, catalog_id, catalog_checked_at, reader_count, counted_at "
+                    f"FROM papers WHERE arxiv_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for arxiv_id, catalog_id, catalog_checked_at, reader_count, counted_at in cursor:
+                    rows[arxiv_id] = {
+                        "catalog_id": catalog_id,
+                        "catalog_checked_at": catalog_checked_at,
+                        "reader_count": reader_count,
+                        "counted_at": counted_at,
+                    }
+        return rows
+
+    def needs_catalog_lookup(self, row, now=None):
+        if row is None or row["catalog_checked_at"] is None:
+            return True
+        if row["catalog_id"]:
+            return False
+        return (now or time.time()) - row["catalog_checked_at"] > self.catalog_miss_ttl - RUN_TIME_SLACK
+
+    def needs_reader_count(self, row, now=None):
+        if row is None or row["counted_at"] is None:
+            return True
+        return (now or time.time()) - row["counted_at"] > self.max_age - RUN_TIME_SLACK
+
+    def save_catalog_ids(self, catalog_ids):
+        """Store {arxiv_id: catalog_id}, None marks a paper that isn't in the catalog"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                """
+                INSERT INTO papers (arxiv_id, catalog_id, catalog_checked_at) VALUES (?, ?, ?)
+                ON CONFLICT(arxiv_id) DO UPDATE SET
+                    catalog_id = excluded.catalog_id,
+                    catalog_checked_at = excluded.catalog_checked_at
+                """,
+                [(arxiv_id, catalog_id, now) for arxiv_id, catalog_id in catalog_ids.items()]
+            )
+            self._db.commit()
+
+    def save_reader_counts(self, reader_counts):
+        """Store {arxiv_id: reader_count} fetched now"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                """
+                INSERT INTO papers (arxiv_id, reader_count, counted_at) VALUES (?, ?, ?)
+                ON CONFLICT(arxiv_id) DO UPDATE SET
+                    reader_count = excluded.reader_count,
+                    counted_at = excluded.counted_at
+                """,
+                [(arxiv_id, reader_count, now) for arxiv_id, reader_count in reader_counts.items()]
+            )
+            self._db.commit()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_reader_count_store():
+    """Return the shared store, or None when it is disabled"""
+    global _store
+    path = os.getenv("AGENTIC_NEWS_READER_COUNT_STORE", READER_COUNT_STORE_PATH)
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = ReaderCountStore(path)
+        return _store
@@ -0,0 +1,98 @@
+"""
+Check which parts of a paper the summary text keeps (arxivnews.pdf_processing).
+
+    python benchmarks/check_paper_sections.py                    # synthetic paper
+    python benchmarks/check_paper_sections.py --pdf paper.pdf    # list the headings of a PDF
+
+The synthetic paper has sections under the paper's own titles, table headers
+and labels that look like section names, related work and references. The
+check fails when text that belongs in the summary is dropped or text after
+the references is kept.
+"""
+import os
+import sys
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Lines of the synthetic paper, each page a list of lines
+SYNTHETIC_PAPER = [
+    [
+        "StructPlan: Structured Planning for Tool Calls",
+        "Abstract",
+        "We plan tool calls as a tree. keep-abstract",
+        "1 Introduction",
+        "Agents call tools one at a time. keep-introduction",
+        "2 Related Work",
+        "Prior planners use flat lists. drop-related",
+        "2.1 Tool Use",
+        "Toolformer learns when to call. drop-related-subsection",
+    ],
+    [
+        "3 StructPlan: Planning Tool Calls",
+        "The planner expands a tree of calls. keep-custom-method",
+        "Model",
+        "Accuracy",
+        "GPT-4o 71.2 keep-table-row",
+        "Analysis",
+        "The table lists the accuracy per model. keep-after-table",
+        "4 Where Plans Fail",
+        "Most failures are wrong arguments. keep-custom-results",
+        "Appendix",
+        "Details follow in the appendix. keep-after-label",
+        "5 Conclusion",
+        "Trees beat lists. keep-conclusion",
+    ],
+    [
+        "References",
+        "[1] Schick et al. Toolformer. drop-references",
+        "A Proofs",
+        "The proof of the bound. drop-appendix",
+    ],
+]
+
+def build_pdf(pages):
+    import fitz
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page()
+        for number, line in enumerate(lines):
+            page.insert_text((50, 60 + 16 * number), line, fontsize=10)
+    return doc
+
+def check_synthetic():
+    from arxivnews.pdf_processing import extract_paper_text
+    text = extract_paper_text(build_pdf(SYNTHETIC_PAPER), token_limit=10000, model="gpt-4o-mini")
+    markers = [word for lines in SYNTHETIC_PAPER for line in lines for word in line.split() if word.startswith(("keep-", "drop-"))]
+    failures = []
+    for marker in markers:
+        kept = marker in text
+        if kept != marker.startswith("keep-"):
+            failures.append(f"{marker} was {'kept' if kept else 'dropped'}")
+    print(f"synthetic paper: {len(markers) - len(failures)} of {len(markers)} markers as expected")
+    for failure in failures:
+        print(f"  {failure}")
+    return not failures
+
+def list_headings(path):
+    import fitz
+    from arxivnews.paper_sections import section_of_heading
+    with fitz.open(path) as doc:
+        for page_number, page in enumerate(doc, 1):
+            for line in page.get_text().splitlines():
+                section = section_of_heading(line)
+                if section:
+                    print(f"page {page_number}: {section:<12} {line.strip()}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pdf", help="List the headings found in this PDF instead")
+    args = parser.parse_args()
+    if args.pdf:
+        list_headings(args.pdf)
+        return
+    sys.exit(0 if check_synthetic() else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the local pre-filter (prefilter.py) with the LLM relevance labels.
+
+    python benchmarks/evaluate_prefilter.py                  # recorded fixtures
+    python benchmarks/evaluate_prefilter.py --live           # today's pages and the real LLM
+    python benchmarks/evaluate_prefilter.py --accept 0.95 --reject 0.05 --sweep
+
+The LLM classifies every item of the Hacker News front page and the GitHub
+trending page. For each source the report shows how many items the pre-filter
+decides on its own, how often those decisions agree with the LLM and how many
+items are still sent to the LLM. --sweep repeats the numbers for a grid of
+thresholds, --verbose lists the items where the two disagree.
+"""
+import os
+import sys
+import argparse
+from contextlib import nullcontext
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SWEEP_ACCEPT = [0.8, 0.85, 0.9, 0.95, 0.98]
+SWEEP_REJECT = [0.02, 0.05, 0.1, 0.2]
+
+def load_hackernews():
+    from hackernews.hackernews import get_hackernews_frontpage, extract_ai_news
+    posts = list(get_hackernews_frontpage())
+    relevant = {post["link"] for post in extract_ai_news(posts)}
+    return [(post["title"], post["link"] in relevant) for post in posts]
+
+def load_github():
+    from github.github import fetch_github_repos, extract_ai_repos
+    repos = list(fetch_github_repos())
+    relevant = {repo["full_name"] for repo in extract_ai_repos(repos)}
+    return [(f"{repo['full_name']} {repo['description']}", repo["full_name"] in relevant) for repo in repos]
+
+SOURCES = {
+    "hackernews": load_hackernews,
+    "github": load_github,
+}
+
+def evaluate(labelled, accept, reject):
+    from prefilter import relevance_score, split_by_relevance
+    report = {"items": len(labelled), "accepted": 0, "accepted_agree": 0, "rejected": 0, "rejected_agree": 0, "ambiguous": 0, "disagreements": []}
+    accepted, _, rejected = split_by_relevance(labelled, lambda pair: pair[0], accept, reject)
+    accepted, rejected = {id(pair) for pair in accepted}, {id(pair) for pair in rejected}
+    for pair in labelled:
+        text, relevant = pair
+        probability = relevance_score(text)
+        if id(pair) in accepted:
+            report["accepted"] += 1
+            report["accepted_agree"] += relevant
+            if not relevant:
+                report["disagreements"].append(("accepted", probability, text))
+        elif id(pair) in rejected:
+            report["rejected"] += 1
+            report["rejected_agree"] += not relevant
+            if relevant:
+                report["disagreements"].append(("rejected", probability, text))
+        else:
+            report["ambiguous"] += 1
+    decided = report["accepted"] + report["rejected"]
+    report["agreement"] = (report["accepted_agree"] + report["rejected_agree"]) / decided if decided else 1.0
+    report["sent_to_llm"] = report["ambiguous"] / report["items"] if report["items"] else 0.0
+    return report
+
+def print_report(name, report, verbose):
+    print(f"{name}: {report['items']} items, "
+          f"{report['accepted']} accepted ({report['accepted_agree']} agree), "
+          f"{report['rejected']} rejected ({report['rejected_agree']} agree), "
+          f"{report['ambiguous']} sent to the LLM ({report['sent_to_llm']:.0%}), "
+          f"agreement {report['agreement']:.0%}")
+    if verbose:
+        for decision, probability, text in report["disagreements"]:
+            print(f"    {decision} {probability:.2f} {text}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the relevance pre-filter against the LLM labels")
+    parser.add_argument("--live", action="store_true", help="Use the live pages and the real LLM instead of the fixtures")
+    parser.add_argument("--accept", type=float, help="Accept threshold (default: AGENTIC_NEWS_PREFILTER_ACCEPT or 0.9)")
+    parser.add_argument("--reject", type=float, help="Reject threshold (default: AGENTIC_NEWS_PREFILTER_REJECT or 0.1)")
+    parser.add_argument("--sweep", action="store_true", help="Also report a grid of thresholds")
+    parser.add_argument("--verbose", action="store_true", help="List the items where pre-filter and LLM disagree")
+    args = parser.parse_args()
+
+    if not args.live:
+        os.environ["LITELLM_LOCAL_MODEL_COST_MAP"] = "True"
+        os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+        from fakes import offline
+    from prefilter import get_thresholds
+    accept, reject = get_thresholds(args.accept, args.reject)
+
+    with nullcontext() if args.live else offline():
+        labelled = {name: load() for name, load in SOURCES.items()}
+
+    print(f"accept >= {accept}, reject <= {reject}")
+    for name, items in labelled.items():
+        print_report(name, evaluate(items, accept, reject), args.verbose)
+
+    if args.sweep:
+        print(f"\n{'source':<12} {'accept':>7} {'reject':>7} {'to LLM':>7} {'agreement':>10}")
+        for name, items in labelled.items():
+            for sweep_accept in SWEEP_ACCEPT:
+                for sweep_reject in SWEEP_REJECT:
+                    report = evaluate(items, sweep_accept, sweep_reject)
+                    print(f"{name:<12} {sweep_accept:>7} {sweep_reject:>7} {report['sent_to_llm']:>7.0%} {report['agreement']:>10.0%}")
+
+if __name__ == "__main__":
+    main()
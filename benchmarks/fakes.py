@@ -0,0 +1,216 @@
+"""
+Offline replacements for every external service the pipeline talks to.
+
+`offline()` patches the HTTP layer (requests), litellm, Supabase, S3 and
+Replicate so the real code paths of the sources run against the recorded
+fixtures in benchmarks/fixtures.
+"""
+import io
+import asyncio
+import os
+import json
+import time
+import base64
+from contextlib import contextmanager, ExitStack
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import urlparse
+import requests
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+FIXTURE_PAPER_ID = "2410.01234"
+
+FIXTURE_README = """# Fixture repo
+
+An agent framework used by the offline benchmarks.
+
+## Features
+
+- Runs agents that write code
+- Sandboxed execution
+"""
+
+def read_fixture(name, mode="r"):
+    with open(os.path.join(FIXTURES_DIR, name), mode) as f:
+        return f.read()
+
+def route_request(url):
+    """Return (status, content type, body bytes) of the fixture answering url"""
+    parsed = urlparse(url)
+    host, path = parsed.netloc, parsed.path
+    if host == "news.ycombinator.com":
+        return 200, "text/html", read_fixture("hn_frontpage.html", "rb")
+    if host == "github.com" and path.startswith("/trending"):
+        return 200, "text/html", read_fixture("github_trending.html", "rb")
+    if host == "export.arxiv.org":
+        # Single paper lookups use id_list or an id: query, everything else is the listing
+        if "id_list=2" in parsed.query or "id%3A" in parsed.query:
+            return 200, "application/atom+xml", read_fixture("arxiv_paper.atom", "rb")
+        return 200, "application/atom+xml", read_fixture("arxiv_listing.atom", "rb")
+    if host.endswith("arxiv.org") and path.startswith("/pdf/"):
+        return 200, "application/pdf", read_fixture("paper.pdf", "rb")
+    if host == "api.github.com" and path.endswith("/contents/"):
+        full_name = path[len("/repos/"):-len("/contents/")]
+        files = [{"name": "README.md", "html_url": f"https://github.com/{full_name}/blob/main/README.md"}]
+        return 200, "application/json", json.dumps(files).encode()
+    if host == "api.github.com" and path.endswith("/readme"):
+        content = base64.b64encode(FIXTURE_README.encode()).decode()
+        return 200, "application/json", json.dumps({"content": content}).encode()
+    if host == "api.mendeley.com" and path == "/oauth/token":
+        return 200, "application/json", read_fixture("mendeley_token.json", "rb")
+    if host == "api.mendeley.com" and path == "/catalog":
+        return 200, "application/json", read_fixture("mendeley_catalog.json", "rb")
+    if host == "api.mendeley.com" and path.startswith("/catalog/"):
+        return 200, "application/json", read_fixture("mendeley_stats.json", "rb")
+    return 404, "text/plain", b"no fixture for this url"
+
+class Recorder:
+    """Counts the calls made to every fake backend"""
+
+    def __init__(self, http_latency=0.0, llm_latency=0.0):
+        self.http_latency = http_latency
+        self.llm_latency = llm_latency
+        self.http_requests = 0
+        self.llm_calls = 0
+        self.inserts = []
+        self.uploads = 0
+
+class FakeSupabase:
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.latest_news = json.loads(read_fixture("latest_news.json"))
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+class FakeQuery:
+    TABLE_SOURCES = {
+        "agentic_news_arxiv": "arxiv",
+        "agentic_news_github": "github",
+        "agentic_news_hackernews": "hackernews",
+        "agentic_news_reddit": "reddit",
+    }
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.row = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args, **kwargs):
+        return self
+
+    def insert(self, row):
+        self.row = row
+        return self
+
+    def execute(self):
+        if self.row is not None:
+            self.client.recorder.inserts.append((self.name, self.row))
+            return SimpleNamespace(data=[self.row])
+        if self.name == "subscriptions":
+            return SimpleNamespace(data=[{"email": "reader@example.com"}])
+        source = self.TABLE_SOURCES.get(self.name)
+        return SimpleNamespace(data=[{"posts": self.client.latest_news[source]}] if source else [])
+
+class FakeS3:
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def upload_fileobj(self, fileobj, bucket, key, *args, **kwargs):
+        fileobj.read()
+        self.recorder.uploads += 1
+
+    def put_object(self, **kwargs):
+        self.recorder.uploads += 1
+
+    def upload_file(self, path, bucket, key, *args, **kwargs):
+        self.recorder.uploads += 1
+
+# Prompt marker -> key in llm_responses.json
+LLM_ROUTES = [
+    ("Hacker News front page", "hackernews"),
+    ("daily trending github repositories", "github"),
+    ("top reddit posts of today from several subreddits", "reddit_batch"),
+    ("top reddit post", "reddit"),
+    ("most important parts of an abstract", "highlight"),
+    ("most important parts of a paper", "paper_summary"),
+    ("readme from a github repo", "readme"),
+    ("daily AI news", "email_subject"),
+]
+
+def fake_completion_factory(recorder):
+    responses = json.loads(read_fixture("llm_responses.json"))
+
+    async def acompletion(model=None, messages=None, **kwargs):
+        recorder.llm_calls += 1
+        if recorder.llm_latency:
+            await asyncio.sleep(recorder.llm_latency)
+        prompt = "\n".join(message["content"] for message in messages or [])
+        for marker, key in LLM_ROUTES:
+            if marker in prompt:
+                content = json.dumps(responses[key])
+                break
+        else:
+            raise ValueError(f"No recorded LLM response for prompt: {prompt[:200]!r}")
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+    return acompletion
+
+# Static assets that are downloaded once and cached locally, not services under test
+PASSTHROUGH_HOSTS = {"openaipublic.blob.core.windows.net"}
+
+def fake_request_factory(recorder, real_request=requests.sessions.Session.request):
+    def request(self, method, url, *args, **kwargs):
+        if urlparse(url).netloc in PASSTHROUGH_HOSTS:
+            return real_request(self, method, url, *args, **kwargs)
+        recorder.http_requests += 1
+        if recorder.http_latency:
+            time.sleep(recorder.http_latency)
+        status, content_type, body = route_request(url)
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.headers["Content-Type"] = content_type
+        response.url = url
+        response.encoding = "utf-8"
+        response.reason = "OK" if status == 200 else "Not Found"
+        return response
+    return request
+
+def fake_replicate_run(*args, **kwargs):
+    return io.BytesIO(read_fixture("paper.pdf", "rb")[:4096])
+
+@contextmanager
+def offline(http_latency=0.0, llm_latency=0.0):
+    """Patch every external service, yields a Recorder with call counts"""
+    import db
+    recorder = Recorder(http_latency=http_latency, llm_latency=llm_latency)
+    s3 = FakeS3(recorder)
+    previous_supabase = db._supabase
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch("requests.sessions.Session.request", fake_request_factory(recorder)))
+        stack.enter_context(mock.patch("litellm.acompletion", fake_completion_factory(recorder)))
+        stack.enter_context(mock.patch("boto3.client", lambda *args, **kwargs: s3))
+        stack.enter_context(mock.patch("boto3.Session", lambda *args, **kwargs: SimpleNamespace(client=lambda *a, **k: s3)))
+        stack.enter_context(mock.patch("replicate.run", fake_replicate_run))
+        db._supabase = FakeSupabase(recorder)
+        try:
+            yield recorder
+        finally:
+            db._supabase = previous_supabase
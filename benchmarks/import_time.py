@@ -0,0 +1,93 @@
+"""
+Cold start benchmark for the entry points of the pipeline.
+
+Every module is imported in a fresh interpreter a few times and the median
+import time is compared against its budget. Exits with status 1 when a module
+is over budget, so it can run in CI.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 10 --top 15
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module -> cold start budget in seconds
+IMPORT_BUDGETS = {
+    "app": 0.5,
+    "get_data": 0.5,
+    "make_email": 1.5,
+    "hackernews.hackernews": 2.0,
+    "reddit.reddit": 2.0,
+    "github.github": 3.0,
+    "arxivnews.arxivnews": 3.0,
+}
+
+TIMER = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+def measure_import(module, runs):
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER.format(module=module)],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip()}")
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+def slowest_imports(module, top):
+    """Return the slowest (cumulative seconds, package) pairs reported by -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        # Lines look like "import time:       123 |       4567 |   package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        entries.append((int(cumulative) / 1e6, name.rstrip()))
+    return sorted(entries, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start import times against their budgets")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=0, help="Also show the N slowest imports of each module")
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS))
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'module':<24} {'median':>8} {'budget':>8}")
+    for module in args.modules:
+        budget = IMPORT_BUDGETS.get(module)
+        try:
+            seconds = measure_import(module, args.runs)
+        except RuntimeError as e:
+            print(e)
+            over_budget.append(module)
+            continue
+        status = "" if budget is None or seconds <= budget else "  OVER BUDGET"
+        budget_text = f"{budget:.2f}s" if budget is not None else "-"
+        print(f"{module:<24} {seconds:>7.3f}s {budget_text:>8}{status}")
+        if status:
+            over_budget.append(module)
+        for cumulative, name in slowest_imports(module, args.top):
+            print(f"    {cumulative:>7.3f}s {name}")
+
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
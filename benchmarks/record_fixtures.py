@@ -0,0 +1,67 @@
+"""
+Refresh the benchmark fixtures from the live services.
+
+    python benchmarks/record_fixtures.py
+
+Records the Hacker News front page, the GitHub trending page, an arXiv listing
+feed, the fixture paper's feed and PDF and, when MENDELEY_* credentials are set,
+the Mendeley token, catalog and stats responses. llm_responses.json and
+latest_news.json are curated by hand because they have to match each other.
+"""
+import os
+import sys
+import json
+import requests
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fakes import FIXTURES_DIR, FIXTURE_PAPER_ID
+
+load_dotenv()
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+def record(name, url, **kwargs):
+    response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=60, **kwargs)
+    response.raise_for_status()
+    with open(os.path.join(FIXTURES_DIR, name), "wb") as f:
+        f.write(response.content)
+    print(f"Recorded {name} ({len(response.content)} bytes)")
+    return response
+
+def record_mendeley():
+    credentials = {
+        "grant_type": "refresh_token",
+        "refresh_token": os.getenv("MENDELEY_REFRESH_TOKEN"),
+        "client_id": os.getenv("MENDELEY_CLIENT_ID"),
+        "client_secret": os.getenv("MENDELEY_CLIENT_SECRET"),
+    }
+    if not all(credentials.values()):
+        print("Skipping Mendeley fixtures, MENDELEY_* variables are not set")
+        return
+    token = requests.post("https://api.mendeley.com/oauth/token", data=credentials, timeout=60).json()
+    headers = {
+        "Authorization": f"Bearer {token['access_token']}",
+        "Accept": "application/vnd.mendeley-document.1+json",
+    }
+    catalog = record("mendeley_catalog.json", f"https://api.mendeley.com/catalog?arxiv={FIXTURE_PAPER_ID}", headers=headers).json()
+    if catalog:
+        record("mendeley_stats.json", f"https://api.mendeley.com/catalog/{catalog[0]['id']}?view=stats", headers=headers)
+    # Never store the real token
+    with open(os.path.join(FIXTURES_DIR, "mendeley_token.json"), "w") as f:
+        json.dump({"access_token": "fixture-access-token", "token_type": "bearer", "expires_in": token.get("expires_in", 3600)}, f, indent=2)
+
+def main():
+    end_date = datetime.now().date() - timedelta(days=1)
+    start_date = end_date - timedelta(days=1)
+    listing_query = f"cat:cs.AI AND submittedDate:[{start_date:%Y%m%d}2359 TO {end_date:%Y%m%d}2359]"
+    record("hn_frontpage.html", "https://news.ycombinator.com")
+    record("github_trending.html", "https://github.com/trending")
+    record("arxiv_listing.atom", "http://export.arxiv.org/api/query", params={"search_query": listing_query, "max_results": 100})
+    record("arxiv_paper.atom", "http://export.arxiv.org/api/query", params={"id_list": FIXTURE_PAPER_ID})
+    record("paper.pdf", f"https://arxiv.org/pdf/{FIXTURE_PAPER_ID}")
+    record_mendeley()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Offline benchmark of the pipeline stages.
+
+Every stage runs the real code of the sources against the recorded fixtures in
+benchmarks/fixtures, with HTTP, LLM, Supabase, S3 and Replicate replaced by the
+fakes in benchmarks/fakes.py. For each stage the median and p95 latency and the
+throughput in items per second are reported.
+
+    python benchmarks/run_benchmarks.py --save-baseline   # on the base branch
+    python benchmarks/run_benchmarks.py                   # on your change
+
+The second run exits with status 1 when a stage got slower than the baseline by
+more than --threshold. Use --llm-latency / --http-latency to simulate network
+round trips, which is useful for stages that overlap requests.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Must be set before the pipeline modules are imported
+os.environ["AGENTIC_NEWS_CHECKPOINTS"] = "0"
+os.environ["AGENTIC_NEWS_HTTP_CACHE"] = "0"
+os.environ["AGENTIC_NEWS_MENDELEY_TOKEN_CACHE"] = ""
+os.environ["AGENTIC_NEWS_READER_COUNT_STORE"] = ""
+os.environ["AGENTIC_NEWS_ARXIV_STORE"] = ""
+os.environ["AGENTIC_NEWS_ARXIV_REQUEST_INTERVAL"] = "0"
+# The fake LLM has no tokens per minute limit, the repeats shouldn't wait for the real gpt-4o one
+os.environ["AGENTIC_NEWS_LLM_TPM_CAPABLE"] = "200000"
+os.environ["LITELLM_LOCAL_MODEL_COST_MAP"] = "True"
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("MENDELEY_REFRESH_TOKEN", "offline-benchmark")
+os.environ.setdefault("MENDELEY_CLIENT_ID", "offline-benchmark")
+os.environ.setdefault("MENDELEY_CLIENT_SECRET", "offline-benchmark")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "offline-benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "offline-benchmark")
+os.environ.setdefault("S3_BUCKET_NAME", "offline-benchmark")
+os.environ.setdefault("REPLICATE_API_TOKEN", "offline-benchmark")
+
+from fakes import offline, read_fixture, FIXTURE_PAPER_ID
+from adaptive_concurrency import print_concurrency_report
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def hackernews_fetch():
+    from hackernews.hackernews import get_hackernews_frontpage
+    return len(list(get_hackernews_frontpage()))
+
+def hackernews_filter():
+    from hackernews.hackernews import get_hackernews_frontpage, extract_ai_news
+    stories = list(get_hackernews_frontpage())
+    extract_ai_news(stories)
+    return len(stories)
+
+def github_fetch():
+    from github.github import fetch_github_repos
+    return len(list(fetch_github_repos()))
+
+def github_filter():
+    from github.github import fetch_github_repos, extract_ai_repos
+    repos = list(fetch_github_repos())
+    extract_ai_repos(repos)
+    return len(repos)
+
+def github_readme_analysis():
+    from github.make_ai_content import get_ai_content
+    get_ai_content("https://github.com/huggingface/smolagents", "huggingface/smolagents")
+    return 1
+
+def reddit_summaries():
+    from reddit.reddit import SUBREDDITS, summarize_subreddit_posts
+    news = json.loads(read_fixture("latest_news.json"))["reddit"]
+    top_posts = [
+        (post["subreddit"], {
+            "title": post["title"],
+            "score": post["score"],
+            "post_url": post["url"],
+            "num_comments": post["num_comments"],
+            "content": post["summary"],
+        })
+        for post in news
+        if post["subreddit"] in SUBREDDITS
+    ]
+    summarize_subreddit_posts(top_posts)
+    return len(top_posts)
+
+def arxiv_fetch():
+    from arxivnews.arxivnews import fetch_arxiv_papers
+    return len(list(fetch_arxiv_papers()))
+
+def mendeley_reader_counts():
+    from arxivnews.arxivnews import fetch_arxiv_papers
+    from arxivnews.get_mendeley_reader_counts import add_reader_counts
+    papers = list(fetch_arxiv_papers())
+    add_reader_counts(papers)
+    return len(papers)
+
+def arxiv_highlight_image():
+    from arxivnews.generate_arxivnews_json import get_first_page_pdf, highlight_abstract_parts_in_pdf_as_image
+    highlights = json.loads(read_fixture("llm_responses.json"))["highlight"]["text"]
+    pdf_content = get_first_page_pdf(FIXTURE_PAPER_ID)
+    image, _ = highlight_abstract_parts_in_pdf_as_image(
+        pdf_content,
+        "Efficient Tool Use for Language Model Agents via Structured Planning",
+        highlights
+    )
+    if image is None:
+        raise RuntimeError("highlight_abstract_parts_in_pdf_as_image failed")
+    return 1
+
+def arxiv_highlight_image_email():
+    from arxivnews.generate_arxivnews_json import get_first_page_pdf, highlight_abstract_parts_in_pdf_as_image
+    from arxivnews.pdf_processing import PAPER_IMAGE_WIDTH, PAPER_IMAGE_FORMAT, PAPER_IMAGE_MAX_BYTES
+    highlights = json.loads(read_fixture("llm_responses.json"))["highlight"]["text"]
+    pdf_content = get_first_page_pdf(FIXTURE_PAPER_ID)
+    image, _ = highlight_abstract_parts_in_pdf_as_image(
+        pdf_content,
+        "Efficient Tool Use for Language Model Agents via Structured Planning",
+        highlights,
+        target_width=PAPER_IMAGE_WIDTH,
+        image_format=PAPER_IMAGE_FORMAT,
+        max_bytes=PAPER_IMAGE_MAX_BYTES,
+        clip_to_highlights=True
+    )
+    if image is None:
+        raise RuntimeError("highlight_abstract_parts_in_pdf_as_image failed")
+    return 1
+
+def arxiv_paper_text():
+    from arxivnews.generate_arxivnews_json import download_and_extract_paper_info
+    if download_and_extract_paper_info(FIXTURE_PAPER_ID) is None:
+        raise RuntimeError("download_and_extract_paper_info failed")
+    return 1
+
+def arxiv_paper_json():
+    from arxivnews.generate_arxivnews_json import process_arxiv_paper_to_json
+    if process_arxiv_paper_to_json({"paper_id": FIXTURE_PAPER_ID}) is None:
+        raise RuntimeError("process_arxiv_paper_to_json failed")
+    return 1
+
+def email_html():
+    from make_email import create_html_email
+    news = json.loads(read_fixture("latest_news.json"))
+    create_html_email(news)
+    return sum(len(posts) for posts in news.values())
+
+def email_render():
+    from make_email import render_email
+    email = render_email()
+    return sum(len(posts) for posts in email["news"].values())
+
+# Stage name -> function running it once and returning the number of items it handled
+STAGES = {
+    "hackernews.fetch": hackernews_fetch,
+    "hackernews.filter": hackernews_filter,
+    "github.fetch": github_fetch,
+    "github.filter": github_filter,
+    "github.readme_analysis": github_readme_analysis,
+    "reddit.summaries": reddit_summaries,
+    "arxiv.fetch": arxiv_fetch,
+    "arxiv.mendeley_reader_counts": mendeley_reader_counts,
+    "arxiv.highlight_image": arxiv_highlight_image,
+    "arxiv.highlight_image_email": arxiv_highlight_image_email,
+    "arxiv.paper_text": arxiv_paper_text,
+    "arxiv.paper_json": arxiv_paper_json,
+    "email.html": email_html,
+    "email.render": email_render,
+}
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_stage(func, repeat, warmup):
+    for _ in range(warmup):
+        func()
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = func()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    return {
+        "items": items,
+        "median_ms": median * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "items_per_second": items / median if median else None,
+    }
+
+def find_regressions(results, baseline, threshold, min_delta_ms):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or "median_ms" not in result or "median_ms" not in previous:
+            continue
+        delta = result["median_ms"] - previous["median_ms"]
+        if delta > min_delta_ms and result["median_ms"] > previous["median_ms"] * (1 + threshold):
+            regressions.append((name, previous["median_ms"], result["median_ms"]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages offline against recorded fixtures")
+    parser.add_argument("stages", nargs="*", help=f"Stages to run (default: all). Available: {', '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per stage")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="Simulated seconds per HTTP request")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown of the median")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+
+    results = {}
+    failed = []
+    print(f"{'stage':<30} {'items':>6} {'median':>10} {'p95':>10} {'items/s':>10}")
+    with offline(http_latency=args.http_latency, llm_latency=args.llm_latency) as recorder:
+        for name in args.stages or STAGES:
+            try:
+                result = run_stage(STAGES[name], args.repeat, args.warmup)
+            except Exception as e:
+                print(f"{name:<30} error: {e!r}")
+                results[name] = {"error": repr(e)}
+                failed.append(name)
+                continue
+            results[name] = result
+            throughput = f"{result['items_per_second']:.1f}" if result["items_per_second"] else "-"
+            print(f"{name:<30} {result['items']:>6} {result['median_ms']:>8.1f}ms {result['p95_ms']:>8.1f}ms {throughput:>10}")
+        print(f"Fake backends: {recorder.http_requests} HTTP requests, {recorder.llm_calls} LLM calls, "
+              f"{len(recorder.inserts)} inserts, {recorder.uploads} uploads")
+        print_concurrency_report()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold, args.min_delta_ms)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.1f}ms -> {after:.1f}ms")
+        if regressions:
+            sys.exit(1)
+
+    if failed:
+        print(f"Failed stages: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
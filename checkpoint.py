@@ -0,0 +1,95 @@
+"""
+Local on-disk checkpoints for pipeline stages.
+
+Every stage result is stored as JSON under CHECKPOINT_DIR/<run date>/<stage>.json.
+A rerun for the same date loads the stored results instead of scraping, rendering
+and calling the LLM again, so it resumes from the first incomplete stage.
+
+Set AGENTIC_NEWS_RUN_DATE=YYYY-MM-DD to resume a specific day and
+AGENTIC_NEWS_CHECKPOINTS=0 to disable checkpoints completely.
+"""
+import os
+import json
+import re
+import tempfile
+import functools
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHECKPOINT_DIR = os.getenv("AGENTIC_NEWS_CHECKPOINT_DIR", ".checkpoints")
+
+def checkpoints_enabled():
+    return os.getenv("AGENTIC_NEWS_CHECKPOINTS", "1") != "0"
+
+def get_run_date():
+    return os.getenv("AGENTIC_NEWS_RUN_DATE") or datetime.now().date().isoformat()
+
+def get_checkpoint_path(stage, run_date=None):
+    # Stage names may contain a sub key like "reddit_post/LocalLLaMA"
+    safe_stage = re.sub(r"[^A-Za-z0-9_.-]", "_", stage)
+    return os.path.join(CHECKPOINT_DIR, run_date or get_run_date(), f"{safe_stage}.json")
+
+def load_checkpoint(stage, run_date=None):
+    """Return (True, result) when the stage already completed for the run date, otherwise (False, None)"""
+    if not checkpoints_enabled():
+        return False, None
+    path = get_checkpoint_path(stage, run_date)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return True, json.load(f)["result"]
+    except FileNotFoundError:
+        return False, None
+    except (ValueError, KeyError) as e:
+        print(f"Ignoring corrupt checkpoint {path}: {e}")
+        return False, None
+
+def save_checkpoint(stage, result, run_date=None):
+    if not checkpoints_enabled():
+        return
+    path = get_checkpoint_path(stage, run_date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so a crash never leaves a half written checkpoint
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"stage": stage, "saved_at": datetime.now().isoformat(), "result": result}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+def checkpointed(stage):
+    """
+    Decorator that stores the JSON result of a stage for the current run date and
+    returns the stored result on reruns. A None result is treated as a failure and
+    is not stored, so the stage runs again next time.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            done, result = load_checkpoint(stage)
+            if done:
+                print(f"Resuming {stage} from checkpoint")
+                return result
+            result = func(*args, **kwargs)
+            if result is not None:
+                save_checkpoint(stage, result)
+            return result
+        return wrapper
+    return decorator
+
+def run_once(stage, func, *args, **kwargs):
+    """
+    Run a side effecting stage (database insert, email send) at most once per run date.
+    The stage only counts as done when func returns something other than None.
+    """
+    done, _ = load_checkpoint(stage)
+    if done:
+        print(f"Skipping {stage}, already done for {get_run_date()}")
+        return None
+    result = func(*args, **kwargs)
+    if result is not None:
+        save_checkpoint(stage, True)
+    return result
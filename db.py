@@ -0,0 +1,20 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+_supabase = None
+_supabase_lock = threading.Lock()
+
+def get_supabase():
+    """Return the shared Supabase client, creating it on first use"""
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                # Imported here because the supabase package is slow to import
+                from supabase import create_client
+                _supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    return _supabase
@@ -1,16 +1,93 @@
-from arxivnews.arxivnews import main as arxivnews_main
-from github.github import main as github_main
-from hackernews.hackernews import main as hackernews_main
-from reddit.reddit import main as reddit_main
+import time
+import importlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Source name -> module with a main() function. Modules are only imported when
+# the source actually runs, so running one source does not pay for the imports
+# (playwright, fitz, praw, GitPython...) of all the others.
+SOURCES = {
+    "arxiv": "arxivnews.arxivnews",
+    "github": "github.github",
+    "hackernews": "hackernews.hackernews",
+    "reddit": "reddit.reddit",
+}
+
+def load_source(name):
+    if name not in SOURCES:
+        raise ValueError(f"Unknown source {name}, expected one of {list(SOURCES)}")
+    return importlib.import_module(SOURCES[name]).main
+
+def run_source(name):
+    load_source(name)()
 
 def run_arxiv_news():
-    arxivnews_main()
+    run_source("arxiv")
 
 def run_github_news():
-    github_main()
+    run_source("github")
 
 def run_hackernews_news():
-    hackernews_main()
+    run_source("hackernews")
 
 def run_reddit_news():
-    reddit_main()
\ No newline at end of file
+    run_source("reddit")
+
+def get_source_stages(names=None):
+    # Each source is independent, so none of them has dependencies
+    return {name: (lambda name=name: run_source(name), []) for name in (SOURCES if names is None else names)}
+
+SOURCE_STAGES = get_source_stages()
+
+def run_stage(name, func):
+    """Run a single stage, returning its status and wall time instead of raising"""
+    start = time.perf_counter()
+    try:
+        func()
+        status, error = "ok", None
+    except Exception as e:
+        print(f"Error in stage {name}: {e}")
+        status, error = "failed", str(e)
+    elapsed = time.perf_counter() - start
+    print(f"Stage {name} finished ({status}) in {elapsed:.1f}s")
+    return {"status": status, "seconds": elapsed, "error": error}
+
+def run_dag(stages, max_workers=4):
+    """
+    Run stages given as {name: (func, [dependency names])} with bounded concurrency.
+    A stage starts once all its dependencies have finished, whether they succeeded
+    or not, so one failing source never cancels the others. A stage whose
+    dependencies all failed has nothing to work with and is skipped.
+    Returns {name: {"status", "seconds", "error"}}, status is ok, failed or skipped.
+    """
+    for name, (_, deps) in stages.items():
+        missing = [dep for dep in deps if dep not in stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {missing}")
+
+    results = {}
+    pending = dict(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            ready = [name for name, (_, deps) in pending.items() if all(dep in results for dep in deps)]
+            for name in ready:
+                func, deps = pending.pop(name)
+                if deps and all(results[dep]["status"] != "ok" for dep in deps):
+                    print(f"Stage {name} skipped, all of its dependencies failed")
+                    results[name] = {"status": "skipped", "seconds": 0.0, "error": "all dependencies failed"}
+                    continue
+                running[executor.submit(run_stage, name, func)] = name
+            if not running:
+                if ready:
+                    # Only skipped stages, they may have unblocked others
+                    continue
+                raise ValueError(f"Dependency cycle between stages: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+def print_stage_report(results):
+    print("Stage timings:")
+    for name, result in sorted(results.items(), key=lambda item: item[1]["seconds"], reverse=True):
+        print(f"  {name:<12} {result['status']:<7} {result['seconds']:.1f}s")
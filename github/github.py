@@ -1,35 +1,32 @@
-import requests
+from http_client import http_get
 from bs4 import BeautifulSoup
 from llm import call_llm
-from supabase import create_client, Client
+from token_budget import fit_records
+from db import get_supabase
 from dotenv import load_dotenv
 import os 
 import json
-from .process_github_repos import process_github_repos_to_json
+from .process_github_repos import process_github_repo_to_json
+from source import Source
+from prefilter import prefilter
+from selection import format_numbered, pick_selected
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Load environment variables for Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 def fetch_github_repos():
     """
     Fetch all trending GitHub repositories using web scraping
-    Returns a list of repository dictionaries
+    Yields repository dictionaries
     """
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
-    all_repos = []
     url = "https://github.com/trending"
     
     try:
-        response = requests.get(url, headers=headers)
+        response = http_get(url, headers=headers)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -76,14 +73,12 @@ def fetch_github_repos():
                 'forks_count': convert_to_number(forks),
             }
             
-            all_repos.append(repo_dict)
+            yield repo_dict
             
         print(f"Successfully fetched {len(repo_elements)} repositories")
             
     except Exception as e:
         print(f"Error fetching repositories: {e}")
-    
-    return all_repos
 
 def get_all_unique_user_repos(user_data):
     """Get unique repository URLs from user data, handling None case"""
@@ -103,40 +98,23 @@ def get_top_repos_by_stargazers_count(repos, top_n=3):
     return sorted_repos[:top_n]
 
 def extract_ai_repos(github_repos):
+    # Every repository keeps its share of the budget, only long descriptions are cut
+    formatted_repos = fit_records("github_trending", format_repos(github_repos), "\n")
     prompt = f"""
-    You are getting as input all of the daily trending github repositories. each repository comes in a JSON containing full_name, html_url, description, language, total_stars, stars_today and forks_count.
+    You are getting as input the numbered daily trending github repositories. Each line contains the number, full_name, description and language of a repository.
 
-    We are curating data for an AI newsletter in which we want to add information about all of those repositories. Because of that, your goal is it to find and return all the GitHub repositories that have something to do with AI.
+    We are curating data for an AI newsletter in which we want to add information about all of those repositories. Because of that, your goal is it to find and return the numbers of all the GitHub repositories that have something to do with AI.
 
     Here is the github repos:
 
     ---
-    {github_repos}
+    {formatted_repos}
     ---
 
-    You need to return your result containing all the repositories that are AI-related in JSON format like this:
+    You need to return your result containing the numbers of all the repositories that are AI-related in JSON format like this:
 
     {{
-        "result": [
-            {{
-                "full_name": "full_name",
-                "html_url": "html_url", 
-                "description": "description",
-                "language": "language",
-                "total_stars": "total_stars",
-                "stars_today": "stars_today",
-                "forks_count": "forks_count"
-            }},
-            {{
-                "full_name": "full_name",
-                "html_url": "html_url", 
-                "description": "description",
-                "language": "language",
-                "total_stars": "total_stars",
-                "stars_today": "stars_today",
-                "forks_count": "forks_count"
-            }}
-        ]
+        "result": [0, 4, 9]
     }}
 
     In case you think there are no AI-related posts, you need to return an empty array.
@@ -145,45 +123,63 @@ def extract_ai_repos(github_repos):
     """
 
     response = call_llm(
-        model="gpt-4o-mini",
+        task="relevance",
         response_format={"type": "json_object"},
+        expected_keys=["result"],
+        call_site="github.extract_ai_repos",
         temperature=0.0,
         messages=[{"role": "user", "content": prompt}]
     )
-    return json.loads(response.choices[0].message.content)["result"]
+    return pick_selected(github_repos, response.choices[0].message.content)
 
 
 def add_github_repos_to_database(repos_data):
     data = {
         "posts": repos_data,
     }
-    supabase.table("agentic_news_github").insert(data).execute()
+    return get_supabase().table("agentic_news_github").insert(data).execute()
 
-def main():
-    repos = fetch_github_repos()
-    
-    # Create a formatted string of repos with clear separation
-    formatted_repos = "\n---\n".join([
-        f"""Repository: {repo['full_name']}
-URL: {repo['html_url']}
-Description: {repo['description']}
-Language: {repo['language']}
-Total Stars: {repo['total_stars']}
-Stars Today: {repo['stars_today']}
-Forks: {repo['forks_count']}"""
+def format_repos(repos):
+    # One compact line per repository, the stats don't help deciding whether it is about AI
+    return format_numbered(
+        f"{repo['full_name']} | {repo['description'] or '-'} | {repo['language']}"
         for repo in repos
-    ])
-    
-    ai_repos = extract_ai_repos(formatted_repos)
-    repos_data = process_github_repos_to_json(ai_repos)
-    
-    print("Repos data:", repos_data)
+    )
 
-    add_github_repos_to_database(repos_data)
+class GithubSource(Source):
+    name = "github"
+    # Classify the trending page in a few smaller calls so the slow per repo work
+    # (screenshot, clone, README analysis) starts before the whole page is classified
+    batch_size = 10
+    # Every worker runs its own browser and git clone
+    workers = 3
 
-    print("Done!")
+    def fetch(self):
+        return fetch_github_repos()
+
+    def filter(self, batch):
+        return prefilter(
+            self.name,
+            batch,
+            lambda repo: f"{repo['full_name']} {repo['description']}",
+            extract_ai_repos
+        )
+
+    def enrich(self, item):
+        return process_github_repo_to_json(item)
 
+    def persist(self, items):
+        return add_github_repos_to_database(items)
 
+    def item_key(self, item):
+        return item['full_name']
+
+def main():
+    repos_data = GithubSource().run()
+    
+    print("Repos data:", repos_data)
+
+    print("Done!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,12 +1,13 @@
-import requests
+from http_client import http_get
 from urllib.parse import urlparse
 import base64
 from llm import call_llm
+from token_budget import fit_markdown
 import json
 
 def has_readme(full_name):
     url = f'https://api.github.com/repos/{full_name}/contents/'
-    response = requests.get(url)
+    response = http_get(url, cache=True)
     if response.status_code == 200:
         files = response.json()
         for file in files:
@@ -22,13 +23,15 @@ def get_raw_readme_content(github_url):
     # GitHub API endpoint for README
     api_url = f"https://api.github.com/repos/{owner}/{repo}/readme"
     # Make request to GitHub API
-    response = requests.get(api_url)
+    response = http_get(api_url, cache=True)
     response.raise_for_status()  # Raise exception for bad status codes
     # Decode content (GitHub API returns base64 encoded content)
     content = base64.b64decode(response.json()['content']).decode('utf-8')
     return content
 
 def get_prompt(readme_content):
+    # Long READMEs are cut at a section boundary, the overview at the top matters most
+    readme_content = fit_markdown("github_readme", readme_content)
     prompt = f"""
     You are a helpful assistant that extracts the most important parts of a readme from a github repo. You need to make a summary of the readme in bullet points.
     You need to return in JSON format. You only can use bullet points and nothing else. Make it as compact as possible. In the case the content is not english, you always need to translate it to english.
@@ -73,8 +76,10 @@ def get_readme_ai_analysis(github_url):
     raw_readme_content = get_raw_readme_content(github_url)
     prompt = get_prompt(raw_readme_content)
     ai_response = call_llm(
-        model="gpt-4o-mini",
+        task="short_summary",
         response_format={"type": "json_object"},
+        expected_keys=["features", "use cases", "technical highlights"],
+        call_site="github.readme_analysis",
         temperature=0.0,
         messages=[
             {"role": "user", "content": prompt}
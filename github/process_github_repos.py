@@ -1,6 +1,6 @@
 import uuid  
 import os
-import requests
+from http_client import http_get
 from dotenv import load_dotenv
 import boto3
 from llm import call_llm
@@ -16,7 +16,7 @@ load_dotenv()
 
 def has_readme(full_name):
     url = f'https://api.github.com/repos/{full_name}/contents/'
-    response = requests.get(url)
+    response = http_get(url, cache=True)
     if response.status_code == 200:
         files = response.json()
         for file in files:
@@ -29,7 +29,7 @@ def get_readme_url(url):
     full_name = url.split('github.com/')[1]
     api_url = f'https://api.github.com/repos/{full_name}/contents/'
     
-    response = requests.get(api_url)
+    response = http_get(api_url, cache=True)
     if response.status_code == 200:
         files = response.json()
         for file in files:
@@ -124,19 +124,18 @@ def upload_to_s3(screenshot_bytes, filename):
     
     return s3_url
 
+def process_github_repo_to_json(repo):
+    return {
+        "title": repo['full_name'],
+        "url": repo['html_url'],
+        "language": repo['language'],
+        "total_stars": repo['total_stars'],
+        "stars_today": repo['stars_today'],
+        "forks_count": repo['forks_count'],
+        "screenshot": make_screenshot(repo['full_name'], repo['html_url']),
+        "graph_url": get_graph_url(repo['html_url']),
+        "ai_content": get_ai_content(repo['html_url'], repo['full_name'])
+    }
+
 def process_github_repos_to_json(repos):
-    repos_data = []
-    for repo in repos:
-        repo_data = {
-            "title": repo['full_name'],
-            "url": repo['html_url'],
-            "language": repo['language'],
-            "total_stars": repo['total_stars'],
-            "stars_today": repo['stars_today'],
-            "forks_count": repo['forks_count'],
-            "screenshot": make_screenshot(repo['full_name'], repo['html_url']),
-            "graph_url": get_graph_url(repo['html_url']),
-            "ai_content": get_ai_content(repo['html_url'], repo['full_name'])
-        }
-        repos_data.append(repo_data)
-    return repos_data
\ No newline at end of file
+    return [process_github_repo_to_json(repo) for repo in repos]
@@ -1,45 +1,37 @@
-import requests
+from http_client import http_get
 from bs4 import BeautifulSoup
 from llm import call_llm
-from supabase import create_client, Client
+from db import get_supabase
 from dotenv import load_dotenv
 import os 
 import json
+from source import Source
+from prefilter import prefilter
+from selection import format_numbered, pick_selected
+from urllib.parse import urlparse
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Load environment variables for Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def format_post(post):
+    return f"{post['title']} ({urlparse(post['link']).netloc or 'news.ycombinator.com'})"
 
 def extract_ai_news(hackernews_posts):
     prompt = f"""
-    You are getting as input the title and link from all of the posts on the Hacker News front page.
+    You are getting as input the numbered titles (with the website they link to) of the posts on the Hacker News front page.
 
-    We are curating data for an AI newsletter, and you need to return all the titles and links of the posts that are AI-related. 
+    We are curating data for an AI newsletter, and you need to return the numbers of all the posts that are AI-related.
 
     Here is the hackernews posts:
 
     ---
-    {hackernews_posts}
+    {format_numbered(format_post(post) for post in hackernews_posts)}
     ---
 
     You need to return your result in JSON format like this:
 
     {{
-        "result": [
-            {{
-                "title": "title",
-                "link": "link"
-            }},
-            {{
-                "title": "title",
-                "link": "link"
-            }}
-        ]
+        "result": [3, 7, 12]
     }}
 
     In case you think there are no AI-related posts, you need to return an empty array.
@@ -48,19 +40,21 @@ def extract_ai_news(hackernews_posts):
     """
 
     response = call_llm(
-        model="gpt-4o-mini",
+        task="relevance",
         response_format={"type": "json_object"},
+        expected_keys=["result"],
+        call_site="hackernews.extract_ai_news",
         temperature=0.0,
         messages=[{"role": "user", "content": prompt}]
     )
-    return json.loads(response.choices[0].message.content)["result"]
+    return pick_selected(hackernews_posts, response.choices[0].message.content)
 
 def get_hackernews_frontpage():
     # HN front page URL
     url = "https://news.ycombinator.com"
     
     # Fetch the page
-    response = requests.get(url)
+    response = http_get(url)
     
     # Check if the request was successful
     if response.status_code == 200:
@@ -68,36 +62,47 @@ def get_hackernews_frontpage():
         soup = BeautifulSoup(response.text, 'html.parser')
         
         # Find all story titles (they have class 'titleline')
-        stories = []
         for story in soup.find_all('span', class_='titleline'):
             title = story.find('a').text
             link = story.find('a')['href']
-            stories.append({
+            yield {
                 'title': title,
                 'link': link
-            })
-
-        return stories
+            }
     else:
         print(f"Failed to fetch HN: {response.status_code}")
-        return []
     
 def add_ai_news_to_database(ai_posts):
     data = {
         "posts": ai_posts,
     }
     try:
-        response = supabase.table("agentic_news_hackernews").insert(data).execute()
+        response = get_supabase().table("agentic_news_hackernews").insert(data).execute()
         print("Successfully added posts to database")
         return response
     except Exception as e:
         print(f"Error adding posts to database: {e}")
         return None
 
+class HackerNewsSource(Source):
+    name = "hackernews"
+    # The whole front page is classified in a single LLM call
+    batch_size = None
+
+    def fetch(self):
+        return get_hackernews_frontpage()
+
+    def filter(self, batch):
+        return prefilter(self.name, batch, lambda post: post['title'], extract_ai_news)
+
+    def persist(self, items):
+        return add_ai_news_to_database(items)
+
+    def item_key(self, item):
+        return item['link']
+
 def main():
-    stories = get_hackernews_frontpage()
-    ai_posts = extract_ai_news(stories)
-    add_ai_news_to_database(ai_posts)
+    ai_posts = HackerNewsSource().run()
     print("ai_posts:", ai_posts)
 
 if __name__ == "__main__":
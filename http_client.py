@@ -0,0 +1,246 @@
+"""
+Shared HTTP transport for the sources.
+
+Requests to the same host reuse one keep-alive session and connection pool.
+Every request has a timeout, idempotent requests are retried with
+exponential backoff on connection errors, 429 and 5xx (honoring Retry-After),
+and the number of concurrent requests per host follows an adaptive limit
+(see adaptive_concurrency) between a start value and a cap.
+
+GET requests made with cache=True go through an on-disk cache that follows the
+HTTP caching rules: fresh responses (Cache-Control max-age, Expires) are served
+without a request, stale ones are revalidated with If-None-Match /
+If-Modified-Since and a 304 reuses the stored body. no-store responses are
+never written. Once the cache grows past its size limit the entries stored or
+revalidated longest ago are removed.
+
+AGENTIC_NEWS_HTTP_TIMEOUT sets the read timeout in seconds (default 30),
+AGENTIC_NEWS_HTTP_CACHE_DIR the cache directory (default .http_cache),
+AGENTIC_NEWS_HTTP_CACHE_MAX_MB its size limit (default 200) and
+AGENTIC_NEWS_HTTP_CACHE=0 disables the cache.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from adaptive_concurrency import get_limiter
+
+load_dotenv()
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = float(os.getenv("AGENTIC_NEWS_HTTP_TIMEOUT", "30"))
+MAX_RETRIES = 3
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+HTTP_CACHE_DIR = os.getenv("AGENTIC_NEWS_HTTP_CACHE_DIR", ".http_cache")
+HTTP_CACHE_MAX_BYTES = int(float(os.getenv("AGENTIC_NEWS_HTTP_CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+# Concurrent requests per host as (start, cap). The arXiv export API is queried
+# through the arxiv library and paced by arxivnews.arxiv_api, not from here.
+HOST_CONCURRENCY = {
+    "arxiv.org": (2, 4),
+    "api.github.com": (4, 8),
+    # The cap matches the thread pool of the reader count lookups
+    "api.mendeley.com": (10, 100),
+}
+DEFAULT_HOST_CONCURRENCY = (4, 8)
+
+def http_cache_enabled():
+    return os.getenv("AGENTIC_NEWS_HTTP_CACHE", "1") != "0"
+
+_sessions = {}
+_limiters = {}
+_lock = threading.Lock()
+
+def _make_session(host):
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    pool_size = HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY)[1]
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+def get_session(url):
+    """Return the shared session and concurrency limiter of the url's host"""
+    host = urlparse(url).netloc
+    with _lock:
+        if host not in _sessions:
+            initial_limit, max_limit = HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY)
+            _sessions[host] = _make_session(host)
+            _limiters[host] = get_limiter(host, initial_limit, max_limit=max_limit)
+        return _sessions[host], _limiters[host]
+
+def _is_overloaded(response):
+    # The retries of urllib3 hide the 429 and 5xx answers that preceded this one
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    statuses = [response.status_code] + [attempt.status for attempt in getattr(retries, "history", ())]
+    return any(status in RETRY_STATUS_CODES for status in statuses)
+
+def http_request(method, url, timeout=None, **kwargs):
+    session, limiter = get_session(url)
+    limiter.acquire()
+    start = time.monotonic()
+    overloaded = False
+    try:
+        response = session.request(method, url, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+    except (requests.ConnectionError, requests.Timeout):
+        overloaded = True
+        raise
+    else:
+        overloaded = _is_overloaded(response)
+        return response
+    finally:
+        limiter.release(time.monotonic() - start, overloaded)
+
+def _cache_paths(url, params):
+    key = hashlib.sha256(json.dumps([url, sorted((params or {}).items())], default=str).encode()).hexdigest()
+    return os.path.join(HTTP_CACHE_DIR, f"{key}.json"), os.path.join(HTTP_CACHE_DIR, f"{key}.body")
+
+def _cache_control(headers):
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+def _freshness_lifetime(headers):
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return 0
+    if "max-age" in directives:
+        try:
+            return int(directives["max-age"])
+        except ValueError:
+            return 0
+    if "Expires" in headers and "Date" in headers:
+        try:
+            return (parsedate_to_datetime(headers["Expires"]) - parsedate_to_datetime(headers["Date"])).total_seconds()
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+def _is_storable(response):
+    if response.status_code != 200 or "no-store" in _cache_control(response.headers):
+        return False
+    return bool(response.headers.get("ETag") or response.headers.get("Last-Modified") or _freshness_lifetime(response.headers))
+
+def _load_cached(meta_path, body_path):
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+        return meta, body
+    except (FileNotFoundError, ValueError):
+        return None, None
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _stored_headers(headers):
+    # The body is stored decoded, so its transfer headers no longer apply
+    return {name: value for name, value in headers.items() if not re.match(r"(?i)content-(length|encoding)$", name)}
+
+def _store(meta_path, body_path, response, body):
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    meta = {"url": response.url, "headers": _stored_headers(response.headers), "stored_at": time.time()}
+    _write_atomic(body_path, body)
+    _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+    _prune_cache()
+
+_prune_lock = threading.Lock()
+
+def _prune_cache(max_bytes=None):
+    """Remove the entries written longest ago until the cache fits max_bytes"""
+    max_bytes = HTTP_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    with _prune_lock:
+        entries = []
+        total = 0
+        for entry in os.scandir(HTTP_CACHE_DIR):
+            if not entry.name.endswith(".json"):
+                continue
+            body_path = entry.path[:-len(".json")] + ".body"
+            try:
+                meta_stat = entry.stat()
+                size = meta_stat.st_size + os.path.getsize(body_path)
+            except FileNotFoundError:
+                continue
+            # The metadata is rewritten on every store and revalidation
+            entries.append((meta_stat.st_mtime, size, entry.path, body_path))
+            total += size
+        for _, size, meta_path, body_path in sorted(entries):
+            if total <= max_bytes:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+def _cached_response(url, meta, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = meta.get("url") or url
+    response.headers = CaseInsensitiveDict(meta["headers"])
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+def http_get(url, params=None, headers=None, cache=False, **kwargs):
+    """GET url through the shared session of its host, optionally through the disk cache"""
+    if not cache or not http_cache_enabled():
+        return http_request("GET", url, params=params, headers=headers, **kwargs)
+
+    meta_path, body_path = _cache_paths(url, params)
+    meta, body = _load_cached(meta_path, body_path)
+    headers = dict(headers or {})
+    if meta is not None:
+        stored_headers = CaseInsensitiveDict(meta["headers"])
+        try:
+            age = time.time() - meta["stored_at"] + int(stored_headers.get("Age") or 0)
+        except ValueError:
+            age = time.time() - meta["stored_at"]
+        if age < _freshness_lifetime(stored_headers):
+            return _cached_response(url, meta, body)
+        if stored_headers.get("ETag"):
+            headers["If-None-Match"] = stored_headers["ETag"]
+        if stored_headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = stored_headers["Last-Modified"]
+
+    response = http_request("GET", url, params=params, headers=headers, **kwargs)
+    if response.status_code == 304 and meta is not None:
+        # Headers of the 304 update the stored ones, the body stays
+        meta["headers"].update(_stored_headers(response.headers))
+        meta["stored_at"] = time.time()
+        _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        return _cached_response(url, meta, body)
+    if _is_storable(response):
+        _store(meta_path, body_path, response, response.content)
+    response.from_cache = False
+    return response
@@ -1,16 +1,329 @@
-from litellm import completion
 import os
+import json
+import asyncio
+import threading
+import time
+import random
 from dotenv import load_dotenv
+from llm_cache import get_llm_cache, make_cache_key
+from llm_json import LLMResponseError, parse_json_answer
+from llm_usage import record_llm_usage
+from token_budget import get_encoding, fit_messages
+from model_routing import DEFAULT_MODEL, get_route, get_rate_limits
 
 load_dotenv()
 
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+if os.getenv("OPENAI_API_KEY"):
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
-def call_llm(model="gpt-4o-mini", messages=[], max_tokens=None, temperature=0.0, response_format=None):
-    response = completion(
-        model=model, 
+# Budgets of a model outside the tiers of model_routing, defaults match the gpt-4o-mini tier 1 limits
+LLM_RPM = int(os.getenv("AGENTIC_NEWS_LLM_RPM", "500"))
+LLM_TPM = int(os.getenv("AGENTIC_NEWS_LLM_TPM", "200000"))
+# Completion tokens reserved for a call that doesn't set max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+# Seconds a single request may take before it is abandoned and retried
+LLM_TIMEOUT = float(os.getenv("AGENTIC_NEWS_LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("AGENTIC_NEWS_LLM_MAX_RETRIES", "3"))
+# Exponential backoff between retries: 1s, 2s, 4s, ... capped, with jitter
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 30.0
+# Consecutive failed requests that open a model's circuit, and seconds until it is tried again
+LLM_BREAKER_THRESHOLD = int(os.getenv("AGENTIC_NEWS_LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("AGENTIC_NEWS_LLM_BREAKER_RESET", "30"))
+
+# HTTP statuses worth retrying, everything else (bad request, auth) fails right away
+RETRY_STATUS_CODES = {408, 409, 429}
+
+class CircuitOpenError(RuntimeError):
+    """The model failed too often recently, calls fail fast until it is tried again"""
+
+class RateLimiter:
+    """
+    Token buckets for requests per minute and tokens per minute.
+
+    A call reserves its budget up front and sleeps until the buckets are no
+    longer in debt, so concurrent callers are served in order without ever
+    exceeding the limits. It is shared between threads and event loops.
+    """
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def reserve(self, tokens):
+        """Take one request and tokens from the buckets, return the seconds to wait before sending"""
+        with self._lock:
+            self._refill()
+            self._requests -= 1
+            self._tokens -= tokens
+            return max(0.0, -self._requests * 60 / self.rpm, -self._tokens * 60 / self.tpm)
+
+    def adjust(self, tokens):
+        """Give back (positive) or take (negative) tokens once the real usage is known"""
+        with self._lock:
+            self._tokens = min(self.tpm, self._tokens + tokens)
+
+    async def acquire(self, tokens):
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(model):
+    with _rate_limiters_lock:
+        if model not in _rate_limiters:
+            rpm, tpm = get_rate_limits(model) or (LLM_RPM, LLM_TPM)
+            _rate_limiters[model] = RateLimiter(rpm, tpm)
+        return _rate_limiters[model]
+
+class CircuitBreaker:
+    """
+    Opens after threshold consecutive failures so callers fail fast instead of
+    waiting for timeouts. After reset_timeout seconds a single trial request is
+    let through; its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(model):
+    with _circuit_breakers_lock:
+        if model not in _circuit_breakers:
+            _circuit_breakers[model] = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET)
+        return _circuit_breakers[model]
+
+def is_retryable(error):
+    if isinstance(error, (asyncio.TimeoutError, LLMResponseError, ConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        # litellm reports network problems without a status
+        return type(error).__name__ in ("APIConnectionError", "Timeout", "ServiceUnavailableError")
+    return status_code in RETRY_STATUS_CODES or status_code >= 500
+
+def backoff_delay(attempt, error=None):
+    delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    # Rate limit errors tell how long to wait
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        delay = max(delay, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        pass
+    return delay
+
+def count_message_tokens(model, messages):
+    encoding = get_encoding(model)
+    if encoding is None:
+        return sum(len(message.get("content") or "") for message in messages) // 4
+    # Every message carries a few tokens of formatting on top of its content
+    return sum(len(encoding.encode(message.get("content") or "", disallowed_special=())) + 4 for message in messages)
+
+def estimate_tokens(model, messages, max_tokens=None):
+    return count_message_tokens(model, messages) + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+def _response_from_payload(payload):
+    from litellm import ModelResponse
+    return ModelResponse(**payload)
+
+async def _acompletion(model, messages, max_tokens, temperature, response_format, timeout, max_input_tokens=None):
+    # litellm takes seconds to import, so it is only loaded once the first call is made
+    from litellm import acompletion
+    limiter = get_rate_limiter(model)
+    # A request over the model's tokens per minute is refused, the prompt has to fit in one minute's budget
+    request_budget = limiter.tpm - (max_tokens or DEFAULT_COMPLETION_TOKENS)
+    max_input_tokens = min(max_input_tokens, request_budget) if max_input_tokens else request_budget
+    # Tokenizing a long prompt is CPU work, keep it off the event loop
+    messages = await asyncio.to_thread(fit_messages, messages, model, max_input_tokens)
+    estimated_tokens = await asyncio.to_thread(estimate_tokens, model, messages, max_tokens)
+    await limiter.acquire(estimated_tokens)
+    response = await asyncio.wait_for(
+        acompletion(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            response_format=response_format
+        ),
+        timeout
+    )
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        limiter.adjust(estimated_tokens - usage.total_tokens)
+    return response
+
+def _check_json(response, expected_keys):
+    """Repair the JSON answer in place and make sure it has the expected keys"""
+    message = response.choices[0].message
+    data = parse_json_answer(message.content, expected_keys)
+    message.content = json.dumps(data, ensure_ascii=False)
+
+async def _acompletion_with_retries(model, messages, max_tokens, temperature, response_format, timeout, expected_keys, max_retries, max_input_tokens):
+    breaker = get_circuit_breaker(model)
+    wants_json = expected_keys is not None or (response_format or {}).get("type") == "json_object"
+    for attempt in range(max_retries + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{model} failed {LLM_BREAKER_THRESHOLD} times in a row, not calling it for {LLM_BREAKER_RESET:.0f}s")
+        try:
+            response = await _acompletion(model, messages, max_tokens, temperature, response_format, timeout, max_input_tokens)
+            # The model answered, so a bad answer says nothing about its availability
+            breaker.record_success()
+            if wants_json:
+                _check_json(response, expected_keys)
+            return response
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_success()
+                raise
+            if not isinstance(e, LLMResponseError):
+                breaker.record_failure()
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"LLM call to {model} failed ({e!r}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+async def _acall_model(model, messages, max_tokens, temperature, response_format, cache, timeout, expected_keys, call_site, max_retries, max_input_tokens):
+    acompletion = lambda: _acompletion_with_retries(
+        model, messages, max_tokens, temperature, response_format, timeout, expected_keys, max_retries, max_input_tokens
+    )
+    start = time.perf_counter()
+    response = None
+    cached = False
+    error = None
+    try:
+        # Responses are only cached when AGENTIC_NEWS_LLM_CACHE is set, see llm_cache.py
+        llm_cache = get_llm_cache() if cache else None
+        if llm_cache is None:
+            response = await acompletion()
+        else:
+            key = make_cache_key(model, messages, temperature, response_format)
+            response, cached = await llm_cache.aget_or_call(
+                key,
+                acompletion,
+                to_payload=lambda response: response.model_dump(),
+                from_payload=_response_from_payload
+            )
+        return response
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        record_llm_usage(call_site, model, response, time.perf_counter() - start, cached=cached, error=error)
+
+async def acall_llm(model=None, messages=[], max_tokens=None, temperature=0.0, response_format=None, cache=True, timeout=None, expected_keys=None, call_site=None, task=None):
+    """
+    Call the model with retries, backoff and a circuit breaker per model. JSON
+    answers (response_format json_object or expected_keys) are repaired locally
+    when needed and checked for expected_keys, so callers can json.loads them.
+    Tokens, latency and cost are accounted to call_site, see llm_usage.py.
+
+    With a task (see model_routing.py) and no explicit model, the call goes to
+    the task's first model tier and falls back to the next tier when it fails.
+    """
+    if model is not None or task is None:
+        return await _acall_model(
+            model or DEFAULT_MODEL, messages, max_tokens, temperature, response_format,
+            cache, timeout or LLM_TIMEOUT, expected_keys, call_site, LLM_MAX_RETRIES, None
+        )
+    route = get_route(task)
+    for index, tier_model in enumerate(route["models"]):
+        try:
+            return await _acall_model(
+                tier_model, messages, max_tokens, temperature, response_format,
+                cache, timeout or route["timeout"], expected_keys, call_site, route["max_retries"], route["max_input_tokens"]
+            )
+        except Exception as e:
+            if index == len(route["models"]) - 1:
+                raise
+            print(f"{task} call on {tier_model} failed ({e!r}), falling back to {route['models'][index + 1]}")
+
+async def acall_llm_many(requests, max_concurrency=8, return_exceptions=False):
+    """
+    Run many acall_llm requests concurrently, each given as a dict of its keyword
+    arguments. Results come back in the order of requests. With return_exceptions
+    a failed request yields its exception instead of cancelling the others.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(request):
+        async with semaphore:
+            return await acall_llm(**request)
+
+    return await asyncio.gather(*(run(request) for request in requests), return_exceptions=return_exceptions)
+
+# The sync API runs the async one on a single background event loop, so litellm's
+# async clients are reused and call_llm works from any thread
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+        return _loop
+
+def _run(coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_loop()).result()
+
+def call_llm(model=None, messages=[], max_tokens=None, temperature=0.0, response_format=None, cache=True, timeout=None, expected_keys=None, call_site=None, task=None):
+    return _run(acall_llm(
+        model=model,
         messages=messages,
+        max_tokens=max_tokens,
         temperature=temperature,
-        response_format=response_format
-    )
-    return response
\ No newline at end of file
+        response_format=response_format,
+        cache=cache,
+        timeout=timeout,
+        expected_keys=expected_keys,
+        call_site=call_site,
+        task=task
+    ))
+
+def call_llm_many(requests, max_concurrency=8, return_exceptions=False):
+    return _run(acall_llm_many(requests, max_concurrency=max_concurrency, return_exceptions=return_exceptions))
@@ -0,0 +1,194 @@
+"""
+Opt-in persistent cache for LLM responses.
+
+Responses are stored in SQLite, keyed on the model, messages, temperature and
+response_format of the request. Entries expire after a TTL and the least
+recently used entries are evicted once the cache grows past its size limit.
+Identical requests that are in flight at the same time are coalesced, so only
+one of them reaches the API.
+
+Enable it by setting AGENTIC_NEWS_LLM_CACHE to the path of the database file:
+
+    AGENTIC_NEWS_LLM_CACHE=.llm_cache.sqlite python app.py
+
+AGENTIC_NEWS_LLM_CACHE_TTL (seconds, default one week) and
+AGENTIC_NEWS_LLM_CACHE_MAX_MB (default 100) tune expiry and size.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_MB = 100
+
+def make_cache_key(model, messages, temperature, response_format):
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "response_format": response_format,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "expired": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._db.commit()
+
+    def get(self, key):
+        """Return the cached JSON payload for key, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self.stats["expired"] += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return json.loads(value)
+
+    def put(self, key, payload):
+        value = json.dumps(payload, ensure_ascii=False)
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats["evictions"] += 1
+
+    def _claim(self, key):
+        """Return (future, owner) for key; the owner is responsible for resolving the future"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+            return future, owner
+
+    def _release(self, key):
+        with self._lock:
+            del self._in_flight[key]
+
+    def _lookup(self, key):
+        payload = self.get(key)
+        if payload is not None:
+            with self._lock:
+                self.stats["hits"] += 1
+        return payload
+
+    async def aget_or_call(self, key, acall, to_payload, from_payload):
+        """
+        Return the cached response for key, or await acall() once and cache it.
+        Concurrent callers with the same key, from any thread or event loop,
+        wait for the first one instead of calling the API themselves.
+        """
+        payload = self._lookup(key)
+        if payload is not None:
+            return from_payload(payload), True
+
+        future, owner = self._claim(key)
+        if not owner:
+            return from_payload(await asyncio.wrap_future(future)), True
+
+        try:
+            response = await acall()
+            payload = to_payload(response)
+            self.put(key, payload)
+            future.set_result(payload)
+            return response, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(key)
+
+    def get_stats(self):
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["entries"] = entries
+        stats["size_bytes"] = size
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """Return the process wide cache, or None when AGENTIC_NEWS_LLM_CACHE is not set"""
+    global _cache
+    path = os.getenv("AGENTIC_NEWS_LLM_CACHE")
+    if not path:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.path != path:
+            _cache = LLMCache(
+                path,
+                ttl=float(os.getenv("AGENTIC_NEWS_LLM_CACHE_TTL", DEFAULT_TTL)),
+                max_bytes=int(float(os.getenv("AGENTIC_NEWS_LLM_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+            )
+        return _cache
+
+def get_llm_cache_stats():
+    cache = get_llm_cache()
+    return cache.get_stats() if cache else None
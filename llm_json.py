@@ -0,0 +1,71 @@
+"""
+Parsing and validation of JSON answers from the LLM.
+
+Slightly malformed answers (code fences, text around the object, trailing
+commas, an object cut off at the end) are repaired locally, which is much
+cheaper than asking the model again.
+"""
+import re
+import json
+
+class LLMResponseError(ValueError):
+    """The answer is not valid JSON or misses an expected key"""
+
+def _close_unbalanced(text):
+    """Close strings, arrays and objects that were left open at the end of text"""
+    closers = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+    if in_string:
+        text += '"'
+    text = re.sub(r"[,:]\s*$", "", text.rstrip())
+    return text + "".join(reversed(closers))
+
+def repair_json(text):
+    """Return the parsed JSON object of text, repairing common defects, or raise LLMResponseError"""
+    try:
+        return json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        pass
+    if not isinstance(text, str):
+        raise LLMResponseError(f"Expected a JSON string, got {type(text).__name__}")
+    repaired = text.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)(?:```|$)", repaired, re.S)
+    if fenced:
+        repaired = fenced.group(1).strip()
+    start = repaired.find("{")
+    end = repaired.rfind("}")
+    if start == -1:
+        raise LLMResponseError(f"No JSON object in answer: {text[:200]!r}")
+    repaired = repaired[start:end + 1] if end > start else repaired[start:]
+    repaired = re.sub(r",\s*([}\]])", r"\1", repaired)
+    for candidate in (repaired, _close_unbalanced(repaired)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise LLMResponseError(f"Could not repair JSON answer: {text[:200]!r}")
+
+def parse_json_answer(content, expected_keys=None):
+    """Parse content and check that it is an object with all of expected_keys"""
+    data = repair_json(content)
+    if not isinstance(data, dict):
+        raise LLMResponseError(f"Expected a JSON object, got {type(data).__name__}")
+    missing = [key for key in expected_keys or [] if key not in data]
+    if missing:
+        raise LLMResponseError(f"Answer is missing the keys {missing}: {content[:200]!r}")
+    return data
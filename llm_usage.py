@@ -0,0 +1,135 @@
+"""
+Per call site accounting of LLM usage.
+
+Every call_llm records its call_site label, model, prompt and completion
+tokens, latency, whether it was answered from the cache and its estimated
+cost. At the end of a run the totals per call site are written to
+USAGE_DIR/<run date>/<time>.json and appended as one line to
+USAGE_DIR/history.jsonl, so a change of prompt or model shows up as a jump
+in the history.
+
+AGENTIC_NEWS_USAGE_DIR (default .usage) sets the directory,
+AGENTIC_NEWS_USAGE=0 disables writing the reports.
+"""
+import os
+import json
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from checkpoint import get_run_date
+
+load_dotenv()
+
+USAGE_DIR = os.getenv("AGENTIC_NEWS_USAGE_DIR", ".usage")
+
+# USD per million tokens (prompt, completion), used when litellm doesn't know the model
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+def usage_reports_enabled():
+    return os.getenv("AGENTIC_NEWS_USAGE", "1") != "0"
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    try:
+        from litellm import cost_per_token
+        prompt_cost, completion_cost = cost_per_token(model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return prompt_cost + completion_cost
+    except Exception:
+        prices = MODEL_PRICES.get(model)
+        if prices is None:
+            return None
+        return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+class UsageTracker:
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def record(self, call_site, model, prompt_tokens, completion_tokens, seconds, cached=False, error=None):
+        # A cached answer costs nothing, its tokens were paid for by an earlier run
+        cost = 0.0 if cached or error else estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            site = self._sites.setdefault(call_site, {
+                "models": [],
+                "calls": 0,
+                "cached": 0,
+                "errors": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+                "cost": 0.0,
+            })
+            if model not in site["models"]:
+                site["models"].append(model)
+            site["calls"] += 1
+            site["cached"] += cached
+            site["errors"] += error is not None
+            if not cached:
+                site["prompt_tokens"] += prompt_tokens
+                site["completion_tokens"] += completion_tokens
+            site["seconds"] += seconds
+            site["max_seconds"] = max(site["max_seconds"], seconds)
+            if cost is not None:
+                site["cost"] += cost
+
+    def get_report(self):
+        with self._lock:
+            sites = {name: dict(site, models=list(site["models"])) for name, site in self._sites.items()}
+        for site in sites.values():
+            site["mean_seconds"] = site["seconds"] / site["calls"] if site["calls"] else 0.0
+        return {
+            "run_date": get_run_date(),
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "totals": {
+                key: sum(site[key] for site in sites.values())
+                for key in ("calls", "cached", "errors", "prompt_tokens", "completion_tokens", "seconds", "cost")
+            },
+            "call_sites": sites,
+        }
+
+_tracker = UsageTracker()
+
+def record_llm_usage(call_site, model, response=None, seconds=0.0, cached=False, error=None):
+    usage = getattr(response, "usage", None)
+    _tracker.record(
+        call_site or "unlabelled",
+        model,
+        getattr(usage, "prompt_tokens", None) or 0,
+        getattr(usage, "completion_tokens", None) or 0,
+        seconds,
+        cached=cached,
+        error=error
+    )
+
+def get_usage_report():
+    return _tracker.get_report()
+
+def print_usage_report(report=None):
+    report = report or get_usage_report()
+    if not report["call_sites"]:
+        return
+    print(f"{'LLM call site':<28} {'calls':>6} {'cached':>7} {'errors':>7} {'prompt':>9} {'completion':>11} {'seconds':>8} {'cost $':>8}")
+    ordered = sorted(report["call_sites"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+    for name, site in ordered + [("total", report["totals"])]:
+        print(f"{name:<28} {site['calls']:>6} {site['cached']:>7} {site['errors']:>7} {site['prompt_tokens']:>9} "
+              f"{site['completion_tokens']:>11} {site['seconds']:>8.1f} {site['cost']:>8.4f}")
+
+def save_usage_report(report=None):
+    """Write the report of this run and append it to the history, return the report path"""
+    if not usage_reports_enabled():
+        return None
+    report = report or get_usage_report()
+    run_dir = os.path.join(USAGE_DIR, report["run_date"])
+    os.makedirs(run_dir, exist_ok=True)
+    path = os.path.join(run_dir, f"{datetime.now():%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.join(USAGE_DIR, "history.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(report) + "\n")
+    return path
@@ -1,30 +1,23 @@
-from supabase import create_client
 import resend 
 import os
-from supabase import create_client, Client
+from db import get_supabase
 from dotenv import load_dotenv
 import os 
 from llm import call_llm
+from token_budget import fit_data
 import json
-import replicate
-import boto3
 import io
-from botocore.exceptions import NoCredentialsError
 import uuid
+from checkpoint import checkpointed, run_once, load_checkpoint, save_checkpoint
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Load environment variables for Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 resend.api_key = os.getenv("RESEND_API_KEY")
 
 def get_latest_news():
     try:
+        supabase = get_supabase()
         # Get latest posts from each table
         arxiv_latest = supabase.table('agentic_news_arxiv') \
             .select('posts') \
@@ -297,7 +290,15 @@ def create_html_email(news_data):
     
     return email_html
 
+# Dropped from the news one after the other when they don't fit, titles and summaries stay
+EMAIL_SUBJECT_DROP_FIELDS = [
+    "screenshot", "graph_url", "image_url", "paper_url", "url", "link",
+    "forks_count", "total_stars", "stars_today", "score", "num_comments", "language",
+    "ai_content",
+]
+
 def make_email_subject_and_summary(ai_news):
+    ai_news = fit_data("email_subject", ai_news, EMAIL_SUBJECT_DROP_FIELDS)
     prompt = f"""
     You are receiving daily AI news from different news platforms.
 
@@ -326,8 +327,10 @@ def make_email_subject_and_summary(ai_news):
     """
 
     response = call_llm(
-        model="gpt-4o-mini",
+        task="headline",
         response_format={"type": "json_object"},
+        expected_keys=["result"],
+        call_site="email.subject_and_summary",
         temperature=0.0,
         messages=[{"role": "user", "content": prompt}]
     )
@@ -338,19 +341,21 @@ def make_email_subject_and_summary(ai_news):
 
 def add_email_to_database(title, summary, email_html, image):
     try:
-        supabase.table('agentic_news_email').insert({
+        get_supabase().table('agentic_news_email').insert({
             "title": title,
             "summary": summary,
             "email": email_html,
             "image": image
         }).execute()
         print("Successfully inserted news into database")
+        return True
     except Exception as e:
         print(f"Error inserting into database: {e}")
+        return None
 
 def get_subscribers():
     try:
-        response = supabase.table('subscriptions').select('email').execute()
+        response = get_supabase().table('subscriptions').select('email').execute()
         return [record['email'] for record in response.data]
     except Exception as e:
         print(f"Error fetching subscribers: {e}")
@@ -375,7 +380,13 @@ def send_email_to_subscribers(html_content, title):
         print("No subscribers found")
         return
 
+    # Subscribers that already got today's email are skipped when a failed run is resumed
+    _, sent = load_checkpoint("email_sent")
+    sent = set(sent or [])
+
     for subscriber_email in subscribers:
+        if subscriber_email in sent:
+            continue
         params = {
             "from": "Agentic News <newsletter@pantheon.so>",
             "to": [subscriber_email],
@@ -386,6 +397,8 @@ def send_email_to_subscribers(html_content, title):
         try:
             email = resend.Emails.send(params)
             print(f"Email sent successfully to {subscriber_email}: {email}")
+            sent.add(subscriber_email)
+            save_checkpoint("email_sent", sorted(sent))
         except Exception as e:
             print(f"Error sending email to {subscriber_email}: {e}")
 
@@ -406,6 +419,11 @@ def make_image(title):
         "prompt_upsampling": True
     }
 
+    # Imported here so rendering the email does not pay for loading replicate and boto3
+    import replicate
+    import boto3
+    from botocore.exceptions import NoCredentialsError
+
     try:
         output = replicate.run(
             "black-forest-labs/flux-1.1-pro",
@@ -440,24 +458,41 @@ def make_image(title):
         return None
         
 
-def main():
+@checkpointed("email_render")
+def render_email():
     news = get_latest_news()
+    if news is None:
+        return None
     email_html = create_html_email(news)
     title, summary = make_email_subject_and_summary(news)
     image = make_image(title)
-    print("news", news)
-    print("email_html", email_html)
-    print("title", title)
-    print("summary", summary)
-    print("image", image)
+    return {
+        "news": news,
+        "email_html": email_html,
+        "title": title,
+        "summary": summary,
+        "image": image
+    }
+
+def main():
+    email = render_email()
+    if email is None:
+        raise RuntimeError("Could not render email, no news available")
+    print("news", email["news"])
+    print("email_html", email["email_html"])
+    print("title", email["title"])
+    print("summary", email["summary"])
+    print("image", email["image"])
     # Call the function to add data to database
-    add_email_to_database(
-        title=title,
-        summary=summary,
-        email_html=email_html,
-        image=image
+    run_once(
+        "email_database",
+        add_email_to_database,
+        title=email["title"],
+        summary=email["summary"],
+        email_html=email["email_html"],
+        image=email["image"]
     )
-    send_email_to_subscribers(email_html, title)
+    send_email_to_subscribers(email["email_html"], email["title"])
 
 if __name__ == "__main__":
     # main()
@@ -0,0 +1,68 @@
+"""
+Routing of LLM calls by task class.
+
+Every call site names the kind of task it runs instead of a model. A task maps
+to an ordered list of model tiers, the input token budget, the timeout and the
+retries per tier. When a tier times out or keeps failing the next one is
+tried, so a slow or unavailable model never stalls the pipeline.
+
+Latency critical tasks (classification, headlines) run on the fast tier while
+long documents go to the capable tier, which has its own rate limits and
+tokenizer, so short calls never queue behind a 100k token summary.
+
+AGENTIC_NEWS_MODEL_FAST and AGENTIC_NEWS_MODEL_CAPABLE override the models,
+AGENTIC_NEWS_LLM_RPM_<TIER> and AGENTIC_NEWS_LLM_TPM_<TIER> (e.g.
+AGENTIC_NEWS_LLM_TPM_CAPABLE) their requests and tokens per minute. The
+defaults are the OpenAI tier 1 limits of gpt-4o-mini and gpt-4o, the fast
+tier also reads AGENTIC_NEWS_LLM_RPM and AGENTIC_NEWS_LLM_TPM.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+MODEL_TIERS = {
+    "fast": os.getenv("AGENTIC_NEWS_MODEL_FAST", "gpt-4o-mini"),
+    "capable": os.getenv("AGENTIC_NEWS_MODEL_CAPABLE", "gpt-4o"),
+}
+
+# (requests per minute, tokens per minute) of every tier
+TIER_RATE_LIMITS = {
+    "fast": (
+        int(os.getenv("AGENTIC_NEWS_LLM_RPM_FAST", os.getenv("AGENTIC_NEWS_LLM_RPM", "500"))),
+        int(os.getenv("AGENTIC_NEWS_LLM_TPM_FAST", os.getenv("AGENTIC_NEWS_LLM_TPM", "200000"))),
+    ),
+    "capable": (
+        int(os.getenv("AGENTIC_NEWS_LLM_RPM_CAPABLE", "500")),
+        int(os.getenv("AGENTIC_NEWS_LLM_TPM_CAPABLE", "30000")),
+    ),
+}
+
+TASK_ROUTES = {
+    # Is this post / repository about AI
+    "relevance": {"tiers": ["fast", "capable"], "max_input_tokens": 16000, "timeout": 30, "max_retries": 1},
+    # Bullet points of a README, a reddit post or an abstract
+    "short_summary": {"tiers": ["fast", "capable"], "max_input_tokens": 16000, "timeout": 45, "max_retries": 2},
+    # Summary of a whole paper
+    "long_summary": {"tiers": ["capable", "fast"], "max_input_tokens": 120000, "timeout": 180, "max_retries": 2},
+    # Email subject and one sentence summary
+    "headline": {"tiers": ["fast", "capable"], "max_input_tokens": 16000, "timeout": 30, "max_retries": 1},
+}
+
+def get_route(task):
+    """Return the route of task with the models of its tiers, the first one is tried first"""
+    if task not in TASK_ROUTES:
+        raise ValueError(f"Unknown LLM task {task!r}, expected one of {', '.join(TASK_ROUTES)}")
+    route = dict(TASK_ROUTES[task])
+    route["models"] = [MODEL_TIERS[tier] for tier in route["tiers"]]
+    route["model"] = route["models"][0]
+    return route
+
+def get_rate_limits(model):
+    """Return (rpm, tpm) of the tier of model, the lower ones when it is in several, None when in none"""
+    limits = [TIER_RATE_LIMITS[tier] for tier, tier_model in MODEL_TIERS.items() if tier_model == model]
+    if not limits:
+        return None
+    return min(rpm for rpm, _ in limits), min(tpm for _, tpm in limits)
@@ -0,0 +1,135 @@
+"""
+Local relevance pre-filter in front of the LLM classifiers.
+
+Titles and descriptions are scored by a hand-weighted linear heuristic over
+word and bigram features. The weights are picked by hand, not fitted on
+labelled data, so they only encode terms that are clearly about AI (or
+clearly not). Items scoring at least the accept threshold are kept without
+asking the LLM. An item is only dropped locally when it scores at or below
+the reject threshold and contains one of the explicit NEGATIVE_WEIGHTS
+features. Everything else, including every text without any known feature
+(new model or product names the table doesn't know), goes to the LLM.
+
+AGENTIC_NEWS_PREFILTER_ACCEPT (default 0.9) and AGENTIC_NEWS_PREFILTER_REJECT
+(default 0.1) tune the band, AGENTIC_NEWS_PREFILTER=0 sends everything to the
+LLM. benchmarks/evaluate_prefilter.py reports how well the pre-filter agrees
+with the LLM labels for a given pair of thresholds, on the fixtures that is
+a small hand-picked sample.
+"""
+import os
+import re
+import math
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_ACCEPT = 0.9
+DEFAULT_REJECT = 0.1
+
+# Score of a text without any AI feature, sigmoid(-3) is about 0.05
+BIAS = -3.0
+
+STRONG = 4.0
+MEDIUM = 1.5
+WEAK = 1.0
+
+FEATURE_WEIGHTS = {
+    # Unambiguous AI terms
+    "ai": STRONG, "llm": STRONG, "gpt": STRONG, "chatgpt": STRONG, "openai": STRONG,
+    "anthropic": STRONG, "claude": STRONG, "gemini": STRONG, "llama": STRONG,
+    "mistral": STRONG, "deepseek": STRONG, "qwen": STRONG, "ollama": STRONG, "phi": MEDIUM,
+    "gemma": STRONG, "deepmind": STRONG, "huggingface": STRONG, "hugging face": STRONG,
+    "pytorch": STRONG, "tensorflow": STRONG, "transformer": STRONG, "diffusion": STRONG,
+    "rag": STRONG, "lora": STRONG, "finetune": STRONG, "finetuning": STRONG,
+    "fine tuning": STRONG, "machine learning": STRONG, "deep learning": STRONG,
+    "neural network": STRONG, "language model": STRONG, "artificial intelligence": STRONG,
+    "reinforcement learning": STRONG, "segment anything": STRONG, "autoencoder": STRONG,
+    "copilot": STRONG, "ml": STRONG, "nlp": STRONG, "embedding": STRONG,
+    # Common in AI news but also elsewhere
+    "agent": MEDIUM, "agentic": STRONG, "inference": MEDIUM, "vector": MEDIUM,
+    "gpu": MEDIUM, "cuda": MEDIUM, "dataset": MEDIUM, "training": MEDIUM, "prompt": MEDIUM,
+    "chatbot": STRONG, "neural": MEDIUM, "reasoning": MEDIUM, "interpretability": MEDIUM,
+    "vision": WEAK, "model": WEAK, "learning": WEAK, "intelligence": WEAK,
+    "semantic": WEAK, "generative": MEDIUM, "robot": WEAK, "forecasting": WEAK,
+}
+
+# Topics that are clearly not AI news, only these let an item be rejected without the LLM
+NEGATIVE_WEIGHTS = {
+    "election": -2.0, "football": -2.0, "soccer": -2.0, "nba": -2.0, "nfl": -2.0,
+    "recipe": -2.0, "cooking": -2.0, "mortgage": -2.0, "real estate": -2.0,
+    "obituary": -2.0, "celebrity": -2.0, "horoscope": -2.0,
+}
+
+# Substrings that mark AI terms inside compound names such as nanoGPT or smolagents
+STEMS = {"gpt": STRONG, "llm": STRONG, "agent": MEDIUM}
+
+def is_enabled():
+    return os.getenv("AGENTIC_NEWS_PREFILTER", "1") != "0"
+
+def get_thresholds(accept=None, reject=None):
+    if accept is None:
+        accept = float(os.getenv("AGENTIC_NEWS_PREFILTER_ACCEPT", DEFAULT_ACCEPT))
+    if reject is None:
+        reject = float(os.getenv("AGENTIC_NEWS_PREFILTER_REJECT", DEFAULT_REJECT))
+    return accept, reject
+
+def tokenize(text):
+    # Split camelCase and snake/kebab case so repository names yield their words
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    # Plurals share the weight of their singular
+    return [token[:-1] if token.endswith("s") and token[:-1] in FEATURE_WEIGHTS else token for token in tokens]
+
+def extract_features(text):
+    tokens = tokenize(text)
+    features = set(tokens)
+    features.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    features.update(f"{first}{second}" for first, second in zip(tokens, tokens[1:]))
+    for token in tokens:
+        for stem in STEMS:
+            if stem in token and token != stem:
+                features.add(f"stem:{stem}")
+    return features
+
+def feature_weight(feature):
+    if feature.startswith("stem:"):
+        return STEMS[feature[len("stem:"):]]
+    return FEATURE_WEIGHTS.get(feature, NEGATIVE_WEIGHTS.get(feature, 0.0))
+
+def score_features(features):
+    score = BIAS + sum(feature_weight(feature) for feature in features)
+    return 1 / (1 + math.exp(-score))
+
+def relevance_score(text):
+    """Return the probability that text is about AI"""
+    return score_features(extract_features(text))
+
+def split_by_relevance(items, text_of, accept=None, reject=None):
+    """Return (accepted, ambiguous, rejected) lists of items, keeping their order"""
+    accept, reject = get_thresholds(accept, reject)
+    accepted, ambiguous, rejected = [], [], []
+    for item in items:
+        features = extract_features(text_of(item))
+        probability = score_features(features)
+        if probability >= accept:
+            accepted.append(item)
+        elif probability <= reject and any(feature in NEGATIVE_WEIGHTS for feature in features):
+            # A low score alone only means no known AI term, the LLM decides those
+            rejected.append(item)
+        else:
+            ambiguous.append(item)
+    return accepted, ambiguous, rejected
+
+def prefilter(name, items, text_of, classify, accept=None, reject=None):
+    """
+    Keep the relevant items: clear positives are accepted locally, clear negatives
+    dropped, and classify() (the LLM) decides on the ambiguous rest.
+    """
+    if not is_enabled():
+        return classify(items) if items else []
+    accepted, ambiguous, rejected = split_by_relevance(items, text_of, accept, reject)
+    print(f"{name} prefilter: {len(accepted)} accepted, {len(rejected)} rejected, {len(ambiguous)} sent to the LLM")
+    kept = accepted + (classify(ambiguous) if ambiguous else [])
+    # The classifiers return the original records, so the page order can be restored
+    kept_ids = {id(item) for item in kept}
+    return [item for item in items if id(item) in kept_ids]
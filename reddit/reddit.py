@@ -14,19 +14,14 @@ import praw
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
-from llm import call_llm
+from llm import call_llm, call_llm_many
 import json
-from supabase import create_client, Client
+from db import get_supabase
+from source import Source
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Load environment variables for Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 load_dotenv()
 
 def get_top_post_today(subreddit_name):
@@ -63,8 +58,8 @@ def metadata_post(post):
     content = post['content'] if post['content'] else ""  # Set default empty string if no content
     return title, score, url, num_comments, content
 
-def summarize_reddit_posts(reddit_post):
-    prompt = f"""
+def get_summary_prompt(reddit_post):
+    return f"""
     You are getting as input the top reddit post from a subreddit for today.
 
     You need to make a short summary about what the post is about.
@@ -86,64 +81,158 @@ def summarize_reddit_posts(reddit_post):
     Return in JSON:
     """
 
+def get_summary_request(reddit_post):
+    return {
+        "task": "short_summary",
+        "response_format": {"type": "json_object"},
+        "expected_keys": ["summary"],
+        "call_site": "reddit.summarize_post",
+        "temperature": 0.0,
+        "messages": [{"role": "user", "content": get_summary_prompt(reddit_post)}]
+    }
+
+def summarize_reddit_posts(reddit_post):
+    response = call_llm(**get_summary_request(reddit_post))
+    return json.loads(response.choices[0].message.content)["summary"]
+
+def summarize_reddit_posts_batch(posts_metadata):
+    """
+    Summarize the top posts of several subreddits in a single LLM call.
+    posts_metadata maps subreddit name -> metadata_post(...) of its top post.
+    Returns {subreddit name: summary} for the subreddits the model answered.
+    """
+    posts = "\n---\n".join(
+        f"Subreddit: {subreddit_name}\nPost: {post_metadata}"
+        for subreddit_name, post_metadata in posts_metadata.items()
+    )
+    prompt = f"""
+    You are getting as input the top reddit posts of today from several subreddits.
+
+    You need to make a short summary about what each post is about.
+
+    Here are the reddit posts:
+
+    ---
+    {posts}
+    ---
+
+    You need to return your result in JSON format with one summary per subreddit, using the subreddit names as keys like this:
+
+    {{
+        "summaries": {{
+            "subreddit name": "summary",
+            "subreddit name": "summary"
+        }}
+    }}
+
+    In the case you are are getting confused by an post because it contains content you cannot handle just use an empty string as its summary. If there is no content in a post just use an empty string.
+
+    Return in JSON:
+    """
     response = call_llm(
-        model="gpt-4o-mini",
+        task="short_summary",
         response_format={"type": "json_object"},
+        expected_keys=["summaries"],
+        call_site="reddit.summarize_batch",
         temperature=0.0,
         messages=[{"role": "user", "content": prompt}]
     )
-    return json.loads(response.choices[0].message.content)["summary"]
+    summaries = json.loads(response.choices[0].message.content)["summaries"]
+    return {
+        subreddit_name: summary
+        for subreddit_name, summary in summaries.items()
+        if subreddit_name in posts_metadata and isinstance(summary, str)
+    }
+
+def summarize_subreddit_posts(top_posts):
+    """
+    Summarize the (subreddit name, top post) pairs with one batched LLM call. Posts
+    the batch call could not answer are summarized with one concurrent wave of
+    single post calls. Returns the post dicts in the order of top_posts.
+    """
+    posts_metadata = {subreddit_name: metadata_post(top_post) for subreddit_name, top_post in top_posts}
+    try:
+        summaries = summarize_reddit_posts_batch(posts_metadata)
+    except Exception as e:
+        print(f"Batched reddit summary failed, summarizing posts one by one: {e}")
+        summaries = {}
+
+    missing = [subreddit_name for subreddit_name in posts_metadata if subreddit_name not in summaries]
+    if missing:
+        responses = call_llm_many(
+            [get_summary_request(posts_metadata[subreddit_name]) for subreddit_name in missing],
+            return_exceptions=True
+        )
+        for subreddit_name, response in zip(missing, responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                summaries[subreddit_name] = json.loads(response.choices[0].message.content)["summary"]
+            except Exception as e:
+                print(f"Error processing subreddit {subreddit_name}: {str(e)}")
+
+    return [
+        {
+            "subreddit": subreddit_name,  # Added subreddit name to identify source
+            "title": post_metadata[0],
+            "url": post_metadata[2],
+            "score": post_metadata[1],
+            "num_comments": post_metadata[3],
+            "summary": summaries[subreddit_name]
+        }
+        for subreddit_name, post_metadata in posts_metadata.items()
+        if subreddit_name in summaries
+    ]
 
 def add_reddit_news_to_database(ai_posts):
     data = {
         "posts": ai_posts,
     }
     try:
-        response = supabase.table("agentic_news_reddit").insert(data).execute()
+        response = get_supabase().table("agentic_news_reddit").insert(data).execute()
         print("Successfully added posts to database")
         return response
     except Exception as e:
         print(f"Error adding posts to database: {e}")
         return None
     
+# List of subreddits to monitor
+SUBREDDITS = [
+    "MachineLearning",
+    "singularity",
+    "ArtificialInteligence",
+    "OpenAI",
+    "StableDiffusion",
+    "LocalLLaMA",
+    "ClaudeAI",
+    "perplexity_ai"
+]
+
+class RedditSource(Source):
+    name = "reddit"
+    # All top posts are summarized together in a single LLM call
+    batch_size = None
+    enrich_batches = True
+
+    def __init__(self, subreddits=SUBREDDITS):
+        self.subreddits = subreddits
+
+    def fetch(self):
+        for subreddit_name in self.subreddits:
+            try:
+                yield subreddit_name, get_top_post_today(subreddit_name)
+            except Exception as e:
+                print(f"Error processing subreddit {subreddit_name}: {str(e)}")
+                continue
+
+    def enrich_batch(self, batch):
+        return summarize_subreddit_posts(batch)
+
+    def persist(self, items):
+        return add_reddit_news_to_database(items)
+
 def main():
-    # List of subreddits to monitor
-    subreddits = [
-        "MachineLearning",
-        "singularity",
-        "ArtificialInteligence",
-        "OpenAI",
-        "StableDiffusion",
-        "LocalLLaMA",
-        "ClaudeAI",
-        "perplexity_ai"
-    ]
-    
-    # List to store all posts
-    all_posts = []
-    
-    # Iterate over each subreddit
-    for subreddit_name in subreddits:
-        try:
-            top_post = get_top_post_today(subreddit_name)
-            post_metadata = metadata_post(top_post)
-            summary = summarize_reddit_posts(post_metadata)
-            dict_post = {
-                "subreddit": subreddit_name,  # Added subreddit name to identify source
-                "title": post_metadata[0],
-                "url": post_metadata[2],
-                "score": post_metadata[1],
-                "num_comments": post_metadata[3],
-                "summary": summary
-            }
-            
-            all_posts.append(dict_post)
-            
-        except Exception as e:
-            print(f"Error processing subreddit {subreddit_name}: {str(e)}")
-            continue
-    
-    add_reddit_news_to_database(all_posts)
+    RedditSource().run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
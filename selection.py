@@ -0,0 +1,38 @@
+"""
+Index based selection for the LLM classifiers.
+
+Instead of asking the model to echo every kept record, the records are sent as
+numbered compact lines and the model answers with the numbers of the ones it
+selects. The records are then picked locally, so they come back unchanged and
+the completion is a few tokens per kept item.
+"""
+import json
+
+def format_numbered(lines):
+    return "\n".join(f"{index}: {line}" for index, line in enumerate(lines))
+
+def parse_selected(content):
+    """
+    Return {index: score} from a {"result": [...]} answer. Entries are either
+    plain indices or {"id": index, "score": score} objects; the score is None
+    when the model didn't give one.
+    """
+    selected = {}
+    for entry in json.loads(content).get("result") or []:
+        score = None
+        if isinstance(entry, dict):
+            score = entry.get("score")
+            entry = entry.get("id")
+        try:
+            selected[int(entry)] = score
+        except (TypeError, ValueError):
+            print(f"Ignoring invalid selection {entry!r}")
+    return selected
+
+def pick_selected(records, content):
+    """Return the records selected by the model's answer, in their original order"""
+    selected = parse_selected(content)
+    invalid = [index for index in selected if not 0 <= index < len(records)]
+    if invalid:
+        print(f"Ignoring selected indices out of range: {invalid}")
+    return [record for index, record in enumerate(records) if index in selected]
@@ -0,0 +1,126 @@
+"""
+Shared streaming pipeline for the news sources.
+
+Every source goes through the same four stages:
+
+    fetch -> filter -> enrich -> persist
+
+fetch() is a generator, filter() receives batches of fetched items as soon as
+a batch is complete and enrich() runs in a thread pool on every kept item, so
+enriching the first items overlaps with fetching and filtering the later ones.
+At most max_pending enrichments are in flight; when they fall behind, fetching
+blocks until one finishes, which keeps memory flat for large sources.
+
+Sources whose enrichment is cheaper for many items at once (one LLM call for a
+whole batch) set enrich_batches and implement enrich_batch() instead.
+
+Filter batches, enriched items and the final insert are checkpointed per run
+date (see checkpoint.py), so a rerun resumes where the last one stopped.
+"""
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from checkpoint import checkpointed, load_checkpoint, run_once
+
+def batched(items, size):
+    """Yield lists of up to size items, or a single list with everything when size is None"""
+    items = iter(items)
+    if size is None:
+        batch = list(items)
+        if batch:
+            yield batch
+        return
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+class Source:
+    # Used for log messages and checkpoint names
+    name = None
+    # Items handed to filter() at once, None waits for the whole fetch
+    batch_size = None
+    # Concurrent enrich() calls
+    workers = 4
+    # Enrichments in flight before fetching blocks
+    max_pending = 8
+    # Hand every filtered batch to enrich_batch() instead of calling enrich() per item
+    enrich_batches = False
+
+    def fetch(self):
+        """Yield raw items"""
+        raise NotImplementedError
+
+    def filter(self, batch):
+        """Return the items of a batch that should be kept"""
+        return batch
+
+    def enrich(self, item):
+        """Return the item that gets persisted, or None to drop it"""
+        return item
+
+    def enrich_batch(self, batch):
+        """Return the enriched items of a whole batch, used when enrich_batches is set"""
+        return [self.enrich(item) for item in batch]
+
+    def persist(self, items):
+        """Store all enriched items, return None on failure"""
+        raise NotImplementedError
+
+    def item_key(self, item):
+        """Stable identifier of an item, used to checkpoint its enrichment"""
+        return repr(sorted(item.items()))
+
+    def _filter(self, batch_index, batch):
+        if type(self).filter is Source.filter:
+            return batch
+        return checkpointed(f"{self.name}_filter_{batch_index}")(self.filter)(batch)
+
+    def _enrich(self, item):
+        """Enrich one item, returns a list with the enriched item or an empty list"""
+        if type(self).enrich is Source.enrich:
+            return [item]
+        key = hashlib.sha1(str(self.item_key(item)).encode("utf-8")).hexdigest()[:16]
+        try:
+            enriched = checkpointed(f"{self.name}_item_{key}")(self.enrich)(item)
+        except Exception as e:
+            # One broken item should not take down the whole source
+            print(f"Error enriching {self.name} item {self.item_key(item)}: {e}")
+            return []
+        return [] if enriched is None else [enriched]
+
+    def _enrich_batch(self, batch_index, batch):
+        try:
+            enriched = checkpointed(f"{self.name}_enriched_{batch_index}")(self.enrich_batch)(batch)
+        except Exception as e:
+            print(f"Error enriching {self.name} batch {batch_index}: {e}")
+            return []
+        return [item for item in enriched or [] if item is not None]
+
+    def run(self):
+        done, _ = load_checkpoint(f"{self.name}_database")
+        if done:
+            print(f"Skipping {self.name}, already persisted for this run date")
+            return None
+
+        items = []
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for batch_index, batch in enumerate(batched(self.fetch(), self.batch_size)):
+                kept = self._filter(batch_index, batch)
+                if self.enrich_batches:
+                    tasks = [(self._enrich_batch, batch_index, kept)] if kept else []
+                else:
+                    tasks = [(self._enrich, item) for item in kept]
+                for task in tasks:
+                    if len(pending) >= self.max_pending:
+                        items.extend(pending.popleft().result())
+                    pending.append(executor.submit(*task))
+            while pending:
+                items.extend(pending.popleft().result())
+
+        print(f"{self.name}: persisting {len(items)} items")
+        run_once(f"{self.name}_database", self.persist, items)
+        return items
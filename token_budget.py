@@ -0,0 +1,197 @@
+"""
+Token budgets for the content embedded into prompts.
+
+Each call site has a budget in PROMPT_BUDGETS. Its input is measured with a
+cached tiktoken encoder and, when it is too large, trimmed with the strategy
+that fits the content:
+
+    fit_text      keep the head and the tail of plain text
+    fit_markdown  keep whole markdown sections in order, trim the first that doesn't fit
+    fit_records   trim every record of a separated list to an equal share
+    fit_data      drop the least useful fields of nested dicts and lists first
+
+Every trim is logged with the call site and the token counts.
+"""
+import json
+from functools import lru_cache
+
+# Call site -> max tokens of the embedded content (not the whole prompt)
+PROMPT_BUDGETS = {
+    "github_readme": 6000,
+    "github_trending": 12000,
+    "email_subject": 8000,
+}
+
+# Context window used as the last resort guard in call_llm
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+}
+DEFAULT_CONTEXT_TOKENS = 128000
+
+TRUNCATION_MARKER = "\n[... truncated ...]\n"
+
+@lru_cache(maxsize=None)
+def get_encoding(model):
+    """Return the tiktoken encoding of model, or None when it can't be loaded"""
+    import tiktoken
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # tiktoken downloads its encodings on first use, which fails without network access
+        print(f"Could not load tokenizer for {model}, estimating tokens from characters: {e}")
+        return None
+
+def count_tokens(text, model="gpt-4o-mini"):
+    encoding = get_encoding(model)
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_head(text, max_tokens, model):
+    """Return the longest prefix of text that fits into max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+def _tail(text, max_tokens, model):
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[-max_tokens * 4:]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[-max_tokens:])
+
+def _log_trim(call_site, before, after):
+    print(f"Trimmed {call_site} input from {before} to {after} tokens")
+
+def truncate_head_tail(text, max_tokens, model="gpt-4o-mini", head_ratio=0.8):
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    budget = max(0, max_tokens - count_tokens(TRUNCATION_MARKER, model))
+    head_tokens = int(budget * head_ratio)
+    return truncate_head(text, head_tokens, model) + TRUNCATION_MARKER + _tail(text, budget - head_tokens, model)
+
+def fit_text(call_site, text, model="gpt-4o-mini", max_tokens=None):
+    max_tokens = max_tokens or PROMPT_BUDGETS[call_site]
+    before = count_tokens(text, model)
+    if before <= max_tokens:
+        return text
+    trimmed = truncate_head_tail(text, max_tokens, model)
+    _log_trim(call_site, before, count_tokens(trimmed, model))
+    return trimmed
+
+def split_markdown_sections(text):
+    sections = []
+    current = []
+    for line in text.splitlines(keepends=True):
+        if line.startswith("#") and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+def fit_markdown(call_site, text, model="gpt-4o-mini", max_tokens=None):
+    """Keep whole sections from the top, the first section that doesn't fit is cut at its head"""
+    max_tokens = max_tokens or PROMPT_BUDGETS[call_site]
+    before = count_tokens(text, model)
+    if before <= max_tokens:
+        return text
+    kept = []
+    remaining = max_tokens - count_tokens(TRUNCATION_MARKER, model)
+    for section in split_markdown_sections(text):
+        tokens = count_tokens(section, model)
+        if tokens > remaining:
+            kept.append(truncate_head(section, remaining, model))
+            break
+        kept.append(section)
+        remaining -= tokens
+    trimmed = "".join(kept) + TRUNCATION_MARKER
+    _log_trim(call_site, before, count_tokens(trimmed, model))
+    return trimmed
+
+def fit_records(call_site, text, separator, model="gpt-4o-mini", max_tokens=None):
+    """Trim each record to an equal share of the budget, records that are short enough stay whole"""
+    max_tokens = max_tokens or PROMPT_BUDGETS[call_site]
+    before = count_tokens(text, model)
+    if before <= max_tokens:
+        return text
+    records = text.split(separator)
+    separator_tokens = count_tokens(separator, model) * (len(records) - 1)
+    sizes = [count_tokens(record, model) for record in records]
+    remaining = max_tokens - separator_tokens
+    # Short records keep everything, the long ones share what is left
+    share = remaining // len(records)
+    for size in sorted(sizes):
+        if size > share:
+            break
+        remaining -= size
+        records_left = sum(1 for other in sizes if other > size) or 1
+        share = max(share, remaining // records_left)
+    trimmed = separator.join(
+        record if size <= share else truncate_head(record, share, model)
+        for record, size in zip(records, sizes)
+    )
+    _log_trim(call_site, before, count_tokens(trimmed, model))
+    return trimmed
+
+def _drop_key(data, key):
+    """Return a copy of data without key in any nested dict"""
+    if isinstance(data, dict):
+        return {k: _drop_key(v, key) for k, v in data.items() if k != key}
+    if isinstance(data, list):
+        return [_drop_key(item, key) for item in data]
+    return data
+
+def fit_data(call_site, data, drop_keys, model="gpt-4o-mini", max_tokens=None, render=str):
+    """
+    Render data (dicts and lists) for a prompt, dropping the keys in drop_keys one
+    after the other until it fits. Falls back to head and tail truncation.
+    """
+    max_tokens = max_tokens or PROMPT_BUDGETS[call_site]
+    text = render(data)
+    before = count_tokens(text, model)
+    if before <= max_tokens:
+        return text
+    dropped = []
+    for key in drop_keys:
+        data = _drop_key(data, key)
+        dropped.append(key)
+        text = render(data)
+        if count_tokens(text, model) <= max_tokens:
+            break
+    else:
+        text = truncate_head_tail(text, max_tokens, model)
+    print(f"Dropped fields {dropped} from {call_site} input")
+    _log_trim(call_site, before, count_tokens(text, model))
+    return text
+
+def fit_messages(messages, model="gpt-4o-mini", max_tokens=None):
+    """
+    Last resort guard: trim the longest message so the prompt fits the model's
+    context window, or max_tokens when that is smaller
+    """
+    context = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    # Leave room for the completion
+    max_tokens = min(int(context * 0.9), max_tokens or context)
+    sizes = [count_tokens(message.get("content") or "", model) for message in messages]
+    total = sum(sizes)
+    if total <= max_tokens:
+        return messages
+    longest = max(range(len(messages)), key=lambda index: sizes[index])
+    allowed = sizes[longest] - (total - max_tokens)
+    message = dict(messages[longest])
+    message["content"] = truncate_head_tail(message["content"], allowed, model, head_ratio=0.5)
+    _log_trim(f"{model} prompt", total, total - sizes[longest] + count_tokens(message["content"], model))
+    return messages[:longest] + [message] + messages[longest + 1:]
+
+def render_json(data):
+    return json.dumps(data, ensure_ascii=False)